@@ -0,0 +1,108 @@
+"""
+Concurrent throughput of the sync endpoints under WSGI vs their async variants under ASGI.
+
+Start both servers against the same database first, e.g.
+    gunicorn mini_crm.wsgi:application --workers 2 --bind :8000
+    gunicorn mini_crm.asgi:application -k uvicorn.workers.UvicornWorker --workers 2 --bind :8001
+
+Usage:
+    python benchmarks/bench_async.py --token <access token> --contact 1 --product 1 \\
+        [--wsgi http://localhost:8000] [--asgi http://localhost:8001] \\
+        [--concurrency 1,10,50] [--requests 500] [--json]
+
+The WSGI server is hit on /api/..., the ASGI server on /api/async/...
+Only the standard library is used so the script runs from any environment.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def scenarios(args):
+    order = json.dumps({
+        'contact': args.contact,
+        'items': [{'product_id': args.product, 'size_name': 'M', 'qty': 1}],
+    }).encode()
+    # name -> (method, path below /api/ or /api/async/, body)
+    return {
+        'health': ('GET', 'health/', None),
+        'product_list': ('GET', 'products/', None),
+        'order_detail': ('GET', f'orders/{args.order}/', None),
+        'order_create': ('POST', 'orders/', order),
+    }
+
+
+def call(url, method, body, token):
+    request = urllib.request.Request(url, data=body, method=method)
+    request.add_header('Authorization', f'Bearer {token}')
+    if body is not None:
+        request.add_header('Content-Type', 'application/json')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run(url, method, body, token, concurrency, n_requests):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: call(url, method, body, token), range(n_requests)))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests': n_requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'rps': round(n_requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi', default='http://localhost:8000')
+    parser.add_argument('--asgi', default='http://localhost:8001')
+    parser.add_argument('--token', required=True)
+    parser.add_argument('--contact', type=int, default=1)
+    parser.add_argument('--product', type=int, default=1)
+    parser.add_argument('--order', type=int, default=1)
+    parser.add_argument('--concurrency', default='1,10,50')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--only', help='comma separated scenario names')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    selected = scenarios(args)
+    if args.only:
+        selected = {name: selected[name] for name in args.only.split(',')}
+    modes = {'wsgi': f"{args.wsgi.rstrip('/')}/api/", 'asgi': f"{args.asgi.rstrip('/')}/api/async/"}
+
+    results = []
+    for name, (method, path, body) in selected.items():
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            for mode, base in modes.items():
+                # /health/ is mounted outside /api/ for the sync server
+                url = f"{args.wsgi.rstrip('/')}/health/" if (mode, name) == ('wsgi', 'health') else base + path
+                row = {'scenario': name, 'mode': mode, 'concurrency': concurrency}
+                row.update(run(url, method, body, args.token, concurrency, args.requests))
+                results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scenario':<14} {'mode':<5} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for row in results:
+        print(f"{row['scenario']:<14} {row['mode']:<5} {row['concurrency']:>5} {row['rps']:>9} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
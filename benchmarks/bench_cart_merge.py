@@ -0,0 +1,61 @@
+"""
+Micro-benchmark for logic.get_normalized_items (cart merge).
+
+Usage:
+    python benchmarks/bench_cart_merge.py [--sizes 10,100,1000,10000,100000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_crm.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from crm_core.logic import get_normalized_items  # noqa: E402
+
+
+def make_cart(n_lines, seed=0):
+    """
+    Builds a cart of n_lines where roughly half the lines merge with an earlier one.
+    Extras mix nested dicts, lists and scalar types.
+    """
+    rng = random.Random(seed)
+    distinct = max(1, n_lines // 2)
+    items = []
+    for _ in range(n_lines):
+        i = rng.randrange(distinct)
+        items.append({
+            'product_id': i % 500,
+            'size_name': ('S', 'M', 'L')[i % 3],
+            'qty': rng.randint(1, 5),
+            'extras': {'toppings': ['cheese', 'olives', i % 7][::rng.choice((1, -1))], 'spice': {'level': i % 4}},
+            'customization': f"note {i % 11}",
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10,100,1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'merged':>8} {'best ms':>10} {'us/line':>9}")
+    for n_lines in (int(n) for n in args.sizes.split(',')):
+        items = make_cart(n_lines)
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            merged = get_normalized_items(items)
+            best = min(best, time.perf_counter() - start)
+        print(f"{n_lines:>8} {len(merged):>8} {best * 1000:>10.2f} {best * 1e6 / n_lines:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
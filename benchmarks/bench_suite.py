@@ -0,0 +1,266 @@
+"""
+Benchmark suite: micro-benchmarks of the pricing, cart and order number logic, end-to-end
+API scenarios driven through the Django test client, and the response encodings (render time
+and payload size of JSONRenderer, FastJSONRenderer and MessagePack, raw and compressed).
+
+Runs against a throwaway test database (created and destroyed like `manage.py test` does)
+filled by datagen.py at the chosen scale, and prints machine-readable JSON.
+
+Usage:
+    python benchmarks/bench_suite.py [--scale small|medium|large] [--orders N ...]
+        [--only micro,e2e,encoding] [--repeat 30] [--output results.json]
+        [--compare baseline.json] [--threshold 0.2]
+
+With --compare, scenarios whose p50 got slower than the baseline by more than --threshold
+(a fraction) are listed on stderr and the exit status is 1.
+"""
+import argparse
+import datetime
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_crm.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+import datagen  # noqa: E402
+from crm_core import renderers  # noqa: E402
+from crm_core.catalog import price_catalog  # noqa: E402
+from crm_core.middleware import brotli  # noqa: E402
+from crm_core.logic import (  # noqa: E402
+    apply_offer, calculate_item_price, generate_order_number, get_normalized_items, quote_items,
+)
+from crm_core.models import Contact, Product, User  # noqa: E402
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    mean = statistics.fmean(samples)
+    return {
+        'samples': len(samples),
+        'mean_ms': round(mean * 1000, 4),
+        'p50_ms': round(samples[len(samples) // 2] * 1000, 4),
+        'p95_ms': round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 4),
+        'min_ms': round(samples[0] * 1000, 4),
+        'max_ms': round(samples[-1] * 1000, 4),
+        'ops_per_s': round(1 / mean, 1) if mean else None,
+    }
+
+
+def measure(fn, repeat, loops=1):
+    """Times `repeat` samples of `loops` calls each; returns per-call statistics."""
+    fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return summarize(samples)
+
+
+def count_queries(fn):
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+def make_cart(product_ids, n_lines):
+    # Every other line repeats the previous one with reordered extras, so half the cart merges
+    items = []
+    for i in range(n_lines):
+        product_id = product_ids[(i // 2) % len(product_ids)]
+        toppings = ['cheese', 'olives'] if i % 2 else ['olives', 'cheese']
+        items.append({'product_id': product_id, 'size_name': 'M', 'qty': 1, 'extras': {'toppings': toppings}})
+    return items
+
+
+def micro_benchmarks(repeat):
+    product = Product.objects.order_by('id').first()
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:500])
+    price_catalog.snapshot()  # warm, as in a running worker
+    scenarios = {
+        'calculate_item_price.size_price': (lambda: calculate_item_price(product, 'M'), 1000),
+        'calculate_item_price.base_fallback': (lambda: calculate_item_price(product, 'NO-SUCH-SIZE'), 1000),
+        'apply_offer': (lambda: apply_offer(Decimal('19.99'), Decimal('10.00')), 10000),
+        'generate_order_number': (generate_order_number, 1000),
+    }
+    for n_lines in (10, 100, 1000):
+        cart = make_cart(product_ids, n_lines)
+        scenarios[f'get_normalized_items.{n_lines}_lines'] = (lambda cart=cart: get_normalized_items(cart), max(1, 10000 // n_lines))
+        scenarios[f'quote_items.{n_lines}_lines'] = (lambda cart=cart: quote_items(cart), max(1, 10000 // n_lines))
+    results = []
+    for name, (fn, loops) in scenarios.items():
+        results.append({'name': name, 'group': 'micro', 'loops': loops, **measure(fn, repeat, loops)})
+    return results
+
+
+def e2e_benchmarks(repeat):
+    admin = User.objects.create_user(username=f'bench-{time.time_ns()}', password='bench', role='admin')
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+    contact_id = Contact.objects.order_by('id').values_list('id', flat=True).first()
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:100])
+
+    def request(method, url, expected, data=None, clear_cache=False):
+        def call():
+            if clear_cache:
+                # Measure the view and ORM path, not the response cache (see http_cache.py)
+                cache.clear()
+            response = getattr(client, method)(url, data, format='json') if data is not None else getattr(client, method)(url)
+            if response.status_code != expected:
+                raise SystemExit(f"{method.upper()} {url} returned {response.status_code}: {response.content[:200]!r}")
+            return response
+        return call
+
+    scenarios = {}
+    for n_lines in (1, 10, 100):
+        items = [{'product_id': product_ids[i % len(product_ids)], 'size_name': 'M', 'qty': 1 + i // len(product_ids)}
+                 for i in range(n_lines)]
+        scenarios[f'order_create.{n_lines}_lines'] = request('post', '/api/orders/', 201, {'contact': contact_id, 'items': items})
+    quote_lines = [{'product_id': product_ids[i % len(product_ids)], 'size_name': 'SML'[i % 3], 'qty': 1 + i % 7}
+                   for i in range(1000)]
+    scenarios['pricing_quote.1000_lines'] = request('post', '/api/pricing/quote', 200, {'items': quote_lines})
+
+    for resource in ('organizations', 'contacts', 'products', 'orders'):
+        url = f'/api/{resource}/'
+        scenarios[f'list.{resource}.first_page'] = request('get', url, 200, clear_cache=True)
+        # Ten pages in: keyset pagination should cost the same as page one
+        for _ in range(10):
+            next_url = client.get(url).json()['next']
+            if not next_url:
+                break
+            url = next_url
+        scenarios[f'list.{resource}.page_11'] = request('get', url, 200, clear_cache=True)
+    scenarios['list.products.first_page_cached'] = request('get', '/api/products/', 200)
+    scenarios['admin_stats'] = request('get', '/api/admin/stats/', 200)
+
+    results = []
+    for name, fn in scenarios.items():
+        fn()  # warm up first so the query count is that of a steady-state request
+        queries = count_queries(fn)
+        results.append({'name': name, 'group': 'e2e', 'queries': queries, **measure(fn, repeat)})
+    return results
+
+
+def encoding_benchmarks(repeat):
+    """Renders a 500 row page of products (with sizes) and orders (with items) with each encoding."""
+    admin = User.objects.create_user(username=f'bench-enc-{time.time_ns()}', password='bench', role='admin')
+    client = APIClient()
+    client.force_authenticate(admin)
+    encoders = {'json_renderer': JSONRenderer().render, 'fast_json': renderers.FastJSONRenderer().render}
+    if renderers.msgpack is not None:
+        encoders['msgpack'] = renderers.MessagePackRenderer().render
+
+    results = []
+    for resource in ('products', 'orders'):
+        data = client.get(f'/api/{resource}/?page_size=500').json()
+        for name, render in encoders.items():
+            body = render(data)
+            sizes = {'bytes': len(body), 'gzip_bytes': len(gzip.compress(body, compresslevel=6))}
+            if brotli is not None:
+                sizes['br_bytes'] = len(brotli.compress(body, quality=4))
+            results.append({'name': f'encoding.{resource}.{name}', 'group': 'encoding', **sizes,
+                            **measure(lambda render=render: render(data), repeat, loops=10)})
+        body = JSONRenderer().render(data)
+        results.append({'name': f'encoding.{resource}.gzip', 'group': 'encoding',
+                        **measure(lambda: gzip.compress(body, compresslevel=6), repeat, loops=10)})
+        if brotli is not None:
+            results.append({'name': f'encoding.{resource}.brotli', 'group': 'encoding',
+                            **measure(lambda: brotli.compress(body, quality=4), repeat, loops=10)})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {row['name']: row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        old = baseline.get(row['name'])
+        if old and old['p50_ms'] and row['p50_ms'] > old['p50_ms'] * (1 + threshold):
+            regressions.append((row['name'], old['p50_ms'], row['p50_ms']))
+    for name, old, new in regressions:
+        print(f"REGRESSION {name}: p50 {old:.4f} ms -> {new:.4f} ms (+{(new / old - 1) * 100:.0f}%)", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_scale_arguments(parser)
+    parser.add_argument('--only', default='micro,e2e,encoding', help="comma separated groups: micro, e2e, encoding")
+    parser.add_argument('--repeat', type=int, default=30, help="samples per scenario")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--compare', help="baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+    groups = set(args.only.split(','))
+    scale = datagen.scale_from_args(args)
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        start = time.perf_counter()
+        counts = datagen.generate(**scale, seed=args.seed)
+        generate_seconds = time.perf_counter() - start
+        results = []
+        if 'micro' in groups:
+            results += micro_benchmarks(args.repeat)
+        if 'e2e' in groups:
+            results += e2e_benchmarks(args.repeat)
+        if 'encoding' in groups:
+            results += encoding_benchmarks(args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'scale': scale,
+            'rows': counts,
+            'generate_seconds': round(generate_seconds, 2),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Synthetic data generator for benchmarks and load tests.
+
+Writes organizations, contacts, products with size prices, and orders with lines in bulk,
+then refreshes what bulk writes skip (dashboard counters, search index, caches).
+The same seed produces the same data apart from a per-run suffix on unique columns.
+
+Usage (writes to the database configured in settings):
+    python benchmarks/datagen.py [--scale small|medium|large] [--orgs N] [--contacts N]
+        [--products N] [--sizes N] [--orders N] [--lines N] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_crm.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+
+from crm_core.catalog import price_catalog  # noqa: E402
+from crm_core.http_cache import RESOURCE_MODELS, bump  # noqa: E402
+from crm_core.logic import apply_offer  # noqa: E402
+from crm_core.models import Contact, Order, OrderItem, Organization, Product, SizePrice  # noqa: E402
+from crm_core.search import SEARCH_TYPES, reindex  # noqa: E402
+from crm_core.stats import recount  # noqa: E402
+
+SCALES = {
+    'small': {'orgs': 20, 'contacts': 200, 'products': 50, 'sizes': 3, 'orders': 500, 'lines': 3},
+    'medium': {'orgs': 200, 'contacts': 2000, 'products': 500, 'sizes': 3, 'orders': 5000, 'lines': 3},
+    'large': {'orgs': 2000, 'contacts': 20000, 'products': 5000, 'sizes': 3, 'orders': 50000, 'lines': 3},
+}
+SIZE_NAMES = ('S', 'M', 'L', 'XL', 'XXL')
+BATCH_SIZE = 2000
+CENT = Decimal('0.01')
+
+
+def bulk(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        model.objects.bulk_create(rows[start:start + BATCH_SIZE])
+
+
+def generate(orgs, contacts, products, sizes, orders, lines, seed=0):
+    """
+    Creates the rows and returns their counts. Ids are read back after each bulk insert, so this
+    works on databases that do not return ids from bulk_create.
+    """
+    rng = random.Random(seed)
+    run = f"{seed}-{time.time_ns() % 10**10}"  # keeps unique columns unique across runs
+
+    with transaction.atomic():
+        bulk(Organization, [
+            Organization(name=f"Org {run}-{i}", address=f"{i} Bench Street", gst_no=f"GST{i:08d}")
+            for i in range(orgs)
+        ])
+        org_ids = list(Organization.objects.filter(name__startswith=f"Org {run}-").values_list('id', flat=True))
+
+        bulk(Contact, [
+            Contact(
+                first_name=f"First{i}", last_name=f"Last{i % 997}", email=f"c{i}.{run}@bench.test",
+                phone=f"555-{i % 1000:03d}-{rng.randrange(10000):04d}", organization_id=rng.choice(org_ids),
+            )
+            for i in range(contacts)
+        ])
+        contact_ids = list(Contact.objects.filter(email__endswith=f".{run}@bench.test").values_list('id', flat=True))
+
+        bulk(Product, [
+            Product(
+                name=f"Product {i}", sku=f"B{run}-{i}", base_price=Decimal(rng.randrange(500, 20000)) / 100,
+                offer_percent=Decimal(rng.choice((0, 0, 5, 10, 25))),
+            )
+            for i in range(products)
+        ])
+        catalog = {
+            product_id: (base_price, offer_percent)
+            for product_id, base_price, offer_percent in Product.objects.filter(sku__startswith=f"B{run}-")
+            .values_list('id', 'base_price', 'offer_percent')
+        }
+        size_names = SIZE_NAMES[:sizes]
+        size_prices = {}
+        for product_id, (base_price, _) in catalog.items():
+            for step, size_name in enumerate(size_names):
+                size_prices[product_id, size_name] = base_price + step
+        bulk(SizePrice, [
+            SizePrice(product_id=product_id, size_name=size_name, price=price)
+            for (product_id, size_name), price in size_prices.items()
+        ])
+
+        product_ids = list(catalog)
+        order_lines = []
+        order_rows = []
+        for i in range(orders):
+            order_line = []
+            for product_id in rng.sample(product_ids, min(lines, len(product_ids))):
+                size_name = rng.choice(size_names) if size_names else 'M'
+                qty = rng.randint(1, 5)
+                base_price, offer_percent = catalog[product_id]
+                unit_price = apply_offer(size_prices.get((product_id, size_name), base_price), offer_percent).quantize(CENT)
+                order_line.append((product_id, size_name, qty, unit_price, unit_price * qty))
+            order_lines.append(order_line)
+            order_rows.append(Order(
+                order_no=f"BENCH-{run}-{i}", contact_id=rng.choice(contact_ids),
+                total=sum((line[4] for line in order_line), Decimal(0)), line_count=len(order_line),
+            ))
+        bulk(Order, order_rows)
+        order_ids = dict(Order.objects.filter(order_no__startswith=f"BENCH-{run}-").values_list('order_no', 'id'))
+        bulk(OrderItem, [
+            OrderItem(
+                order_id=order_ids[f"BENCH-{run}-{i}"], product_id=product_id, size_name=size_name, qty=qty,
+                unit_price=unit_price, line_total=line_total, extras={'gift_wrap': qty % 2 == 0},
+            )
+            for i, order_line in enumerate(order_lines)
+            for product_id, size_name, qty, unit_price, line_total in order_line
+        ])
+
+    # Bulk writes skip the signals that maintain these
+    recount()
+    for kind in SEARCH_TYPES.values():
+        reindex(kind)
+    price_catalog.invalidate()
+    bump(*RESOURCE_MODELS)
+    return {
+        'organizations': len(org_ids), 'contacts': len(contact_ids), 'products': len(product_ids),
+        'size_prices': len(size_prices), 'orders': len(order_rows), 'order_items': sum(map(len, order_lines)),
+    }
+
+
+def add_scale_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for name in SCALES['small']:
+        parser.add_argument(f'--{name}', type=int, help=f"override the scale's {name} count")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def scale_from_args(args):
+    scale = dict(SCALES[args.scale])
+    scale.update({name: getattr(args, name) for name in scale if getattr(args, name) is not None})
+    return scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(**scale_from_args(args), seed=args.seed)
+    print(', '.join(f"{count} {name}" for name, count in counts.items()) + f" in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('health/', async_views.health, name='async-health'),
+    path('products/', async_views.product_list, name='async-product-list'),
+    path('orders/', async_views.order_create, name='async-order-create'),
+    path('orders/<int:pk>/', async_views.order_detail, name='async-order-detail'),
+]
@@ -0,0 +1,150 @@
+"""
+Async (ASGI) variants of the hottest endpoints, mounted under /api/async/.
+
+They answer the same requests with the same payloads as their DRF counterparts, but wait on
+the database without holding a worker thread, so one ASGI worker can keep many slow requests
+in flight. Only useful when served by an ASGI server (see DEPLOY.md); under WSGI Django runs
+them in a fresh event loop per request.
+"""
+import functools
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import cached_principal, load_principal
+from .catalog import price_catalog
+from .idempotency import IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, claim, complete, release, request_fingerprint
+from .logic import create_order, get_normalized_items, price_items
+from .models import Order, Product
+from .pagination import KeysetPagination
+from .serializers import OrderReadSerializer, ProductReadSerializer
+from .views import created_order_body, order_queryset
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+async def authenticate(request):
+    """
+    Async counterpart of CachedJWTAuthentication: validates the Bearer access token and
+    resolves its principal, leaving the event loop only on a principal cache miss. Returns
+    None for a missing, invalid or revoked token or an inactive user.
+    """
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        token = AccessToken(parts[1])
+        return cached_principal(token) or await sync_to_async(load_principal)(token)
+    except (TokenError, AuthenticationFailed):
+        return None
+
+
+def drf_to_json_response(response):
+    # claim() answers with DRF responses; the replay header is the only one they set
+    result = json_response(response.data, status=response.status_code)
+    if response.has_header('Idempotent-Replayed'):
+        result['Idempotent-Replayed'] = response['Idempotent-Replayed']
+    return result
+
+
+def jwt_required(view):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            return json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+@jwt_required
+async def order_create(request):
+    """Same contract as POST /api/orders/."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response({'error': 'Invalid JSON'}, status=400)
+    contact_id = data.get('contact') if isinstance(data, dict) else None
+    items_data = data.get('items', []) if isinstance(data, dict) else None
+
+    if not contact_id or not items_data:
+        return json_response({'error': 'Contact and items are required'}, status=400)
+
+    # Keys are shared with POST /api/orders/: a retry on either route replays the first response
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    record = None
+    if key:
+        if len(key) > MAX_KEY_LENGTH:
+            return json_response({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=400)
+        record, replay = await sync_to_async(claim)(request.user, key, request_fingerprint(data))
+        if replay is not None:
+            return drf_to_json_response(replay)
+
+    normalized_items = get_normalized_items(items_data)
+
+    try:
+        # A warm catalog prices the cart without leaving the event loop
+        priced_items = price_items(normalized_items, snapshot=await price_catalog.asnapshot())
+
+        order_total = sum((line[3] for line in priced_items), Decimal(0))
+
+        on_created = None
+        if record is not None:
+            on_created = lambda order: complete(record, 201, created_order_body(order, priced_items, order_total))
+        # The async ORM has no transactions: the order and its lines are written in one
+        # thread-pool call so they still commit together
+        order = await sync_to_async(create_order)(contact_id, priced_items, order_total, on_created=on_created)
+
+        return json_response(created_order_body(order, priced_items, order_total), status=201)
+
+    except Exception as e:
+        if record is not None:
+            await sync_to_async(release)(record)
+        return json_response({'error': str(e)}, status=400)
+
+
+@require_GET
+@jwt_required
+async def order_detail(request, pk):
+    """Same payload as GET /api/orders/<pk>/."""
+    try:
+        order = await order_queryset().aget(pk=pk)
+    except Order.DoesNotExist:
+        return json_response({'detail': 'No Order matches the given query.'}, status=404)
+    return json_response(OrderReadSerializer(order).data)
+
+
+@require_GET
+@jwt_required
+async def product_list(request):
+    """Same payload as GET /api/products/, including the keyset cursor links."""
+    paginator = KeysetPagination()
+    drf_request = Request(request)
+    products = await sync_to_async(paginator.paginate_queryset)(
+        Product.objects.prefetch_related('sizes'), drf_request
+    )
+    return json_response({
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': ProductReadSerializer(products, many=True).data,
+    })
+
+
+@require_GET
+async def health(request):
+    return json_response({"status": "ok", "app": "mini_crm", "version": "0.1"})
@@ -0,0 +1,126 @@
+"""
+JWT authentication without a user query per request.
+
+Tokens issued by tokens_for_user() carry the user's token_version and role. CachedJWTAuthentication
+resolves the principal from a small in-process LRU keyed by (user id, token version), so only the
+first request of a user per TTL loads the row. Changing a user's password, role or active flag bumps
+token_version, which revokes the tokens issued before (see signals.py); any save or delete of a user
+evicts it from this process's cache, and other processes drop it within AUTH_PRINCIPAL_CACHE_TTL.
+
+With AUTH_STATELESS_JWT the user is never loaded: request.user is a TokenUser whose role comes from
+the token claims. Role changes and revocations then only take effect when the token expires.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'ver'
+ROLE_CLAIM = 'role'
+
+
+def tokens_for_user(user):
+    """RefreshToken for the user; its access token inherits the version and role claims."""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    refresh[ROLE_CLAIM] = user.role
+    return refresh
+
+
+class PrincipalCache:
+    """
+    Thread-safe LRU of active users keyed by (user id, token version), entries expire after
+    AUTH_PRINCIPAL_CACHE_TTL seconds. Callers get a copy, never the cached instance.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, version):
+        # Token claims may carry the id as a string
+        key = (str(user_id), version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.copy(entry[1])
+
+    def put(self, user):
+        ttl = getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 30)
+        max_size = getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 1024)
+        key = (str(user.pk), user.token_version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, copy.copy(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == str(user_id)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def token_principal_key(validated_token):
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    # Tokens issued before the version claim existed belong to version 0
+    return user_id, validated_token.get(TOKEN_VERSION_CLAIM, 0)
+
+
+def cached_principal(validated_token):
+    """The token's principal if it needs no query (stateless mode or a cache hit), else None."""
+    key = token_principal_key(validated_token)
+    if getattr(settings, 'AUTH_STATELESS_JWT', False) and ROLE_CLAIM in validated_token:
+        return TokenUser(validated_token)
+    return principal_cache.get(*key)
+
+
+def load_principal(validated_token):
+    """
+    Loads the token's user and caches it. Raises AuthenticationFailed for unknown or inactive
+    users and for tokens revoked by a token_version bump.
+    """
+    user_id, version = token_principal_key(validated_token)
+    try:
+        user = User.objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise AuthenticationFailed(_("User not found"), code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+    if user.token_version != version:
+        raise AuthenticationFailed(_("Token has been revoked"), code='token_revoked')
+    principal_cache.put(user)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Drop-in replacement for simplejwt's JWTAuthentication (see the module docstring)."""
+    def get_user(self, validated_token):
+        return cached_principal(validated_token) or load_principal(validated_token)
@@ -0,0 +1,85 @@
+"""
+Aggregate payload for the single page app: GET /api/bootstrap/?include=<sections> returns the data
+of several sections in one response, so a page load is one request instead of a chain of them.
+
+Every section is built from a fixed number of queries, whatever the number of rows:
+- organizations: organization id -> name, for pickers (1 query)
+- contacts: the first keyset page of /api/contacts/ with its `next` link (1 query, ?page_size= applies)
+- catalog: products with their size prices, from the price catalog (0 queries warm, 2 cold)
+- stats: dashboard counts (1 query)
+"""
+from django.urls import reverse
+from rest_framework.utils.urls import replace_query_param
+
+from .catalog import price_catalog
+from .db_routers import read_alias
+from .http_cache import recently_written, resource_version
+from .models import Contact, Organization
+from .pagination import KeysetPagination
+from .serializers import ContactReadSerializer, _decimal
+from .stats import COUNTED_MODELS, dashboard_stats
+
+
+def organization_names(request):
+    return dict(Organization.objects.using(read_alias()).order_by('id').values_list('id', 'name'))
+
+
+def first_contacts(request):
+    paginator = KeysetPagination()
+    paginator.base_url = request.build_absolute_uri(reverse('contact-list'))
+    if paginator.page_size_query_param in request.query_params:
+        paginator.base_url = replace_query_param(
+            paginator.base_url, paginator.page_size_query_param, request.query_params[paginator.page_size_query_param],
+        )
+    queryset = Contact.objects.using(read_alias()).select_related('organization')
+    page = paginator.paginate_queryset(queryset, request)
+    return {'next': paginator.get_next_link(), 'results': ContactReadSerializer(page, many=True).data}
+
+
+def catalog_digest(request):
+    snapshot = price_catalog.snapshot()
+    sizes = {}
+    for (product_id, size_name), price in snapshot.size_prices.items():
+        sizes.setdefault(product_id, []).append({'size_name': size_name, 'price': _decimal(price)})
+    return [
+        {
+            'id': product.id,
+            'name': product.name,
+            'base_price': _decimal(product.base_price),
+            'offer_percent': _decimal(product.offer_percent),
+            'sizes': sizes.get(product.id, []),
+        }
+        for product in sorted(snapshot.products.values(), key=lambda product: product.id)
+    ]
+
+
+def dashboard_counts(request):
+    # Revenue stays behind the admin-only /api/admin/stats/: this payload is shared by all users
+    stats = dashboard_stats()
+    return {name: stats[name] for name in COUNTED_MODELS}
+
+
+# section -> (builder, http_cache resources whose changes it reflects)
+SECTIONS = {
+    'organizations': (organization_names, ('organizations',)),
+    'contacts': (first_contacts, ('contacts',)),
+    'catalog': (catalog_digest, ('products',)),
+    'stats': (dashboard_counts, ('organizations', 'contacts', 'products', 'orders')),
+}
+
+
+def section_resources(sections):
+    return {resource for name in sections for resource in SECTIONS[name][1]}
+
+
+def bootstrap_version(sections):
+    """Latest version of the resources behind the sections: changes whenever any of them does."""
+    return max(resource_version(resource) for resource in section_resources(sections))
+
+
+def bootstrap_written_recently(sections):
+    return recently_written(*section_resources(sections))
+
+
+def build_bootstrap(request, sections):
+    return {name: SECTIONS[name][0](request) for name in sections}
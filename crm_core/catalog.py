@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Product, SizePrice
+
+CatalogProduct = namedtuple('CatalogProduct', ['id', 'name', 'base_price', 'offer_percent'])
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the price catalog at one version:
+    - products: product_id -> CatalogProduct
+    - size_prices: (product_id, size_name) -> SizePrice.price
+    - prices: (product_id, size_name) -> effective unit price (offer applied, rounded to cents), for every SizePrice
+    - base_prices: product_id -> effective base price, used when the size has no SizePrice
+    - loaded_at: time.monotonic() of the last full load
+    """
+    __slots__ = ('version', 'products', 'size_prices', 'prices', 'base_prices', 'loaded_at')
+
+    def __init__(self, version, products, size_prices, loaded_at=None):
+        from .logic import apply_offer, round_money
+
+        self.version = version
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        self.products = products
+        self.size_prices = size_prices
+        self.base_prices = {
+            pid: round_money(apply_offer(p.base_price, p.offer_percent)) for pid, p in products.items()
+        }
+        self.prices = {
+            (pid, size_name): round_money(apply_offer(price, products[pid].offer_percent))
+            for (pid, size_name), price in size_prices.items()
+            if pid in products
+        }
+
+    def product(self, product_id):
+        product = self.products.get(int(product_id))
+        if product is None:
+            raise Product.DoesNotExist("Product matching query does not exist.")
+        return product
+
+    def unit_price(self, product_id, size_name):
+        """SizePrice for the size, falling back to base_price. No offer applied."""
+        product = self.product(product_id)
+        return self.size_prices.get((product.id, size_name), product.base_price)
+
+    def effective_price(self, product_id, size_name):
+        """Unit price with the product offer applied, rounded to cents: what orders and quotes charge."""
+        product = self.product(product_id)
+        return self.prices.get((product.id, size_name), self.base_prices[product.id])
+
+
+def load_catalog(product_ids=None):
+    """
+    Reads products and their SizePrice rows in two queries.
+    Returns (products, size_prices) dicts as stored on CatalogSnapshot.
+    """
+    products_qs = Product.objects.all()
+    sizes_qs = SizePrice.objects.all()
+    if product_ids is not None:
+        products_qs = products_qs.filter(id__in=product_ids)
+        sizes_qs = sizes_qs.filter(product_id__in=product_ids)
+    products = {
+        row[0]: CatalogProduct(*row)
+        for row in products_qs.values_list('id', 'name', 'base_price', 'offer_percent')
+    }
+    size_prices = {
+        (product_id, size_name): price
+        for product_id, size_name, price in sizes_qs.values_list('product_id', 'size_name', 'price')
+    }
+    return products, size_prices
+
+
+class PriceCatalog:
+    """
+    In-process cache of the price catalog.
+
+    The snapshot is tagged with a version held in the Django cache. Saving or deleting a Product
+    or SizePrice bumps that version (see signals.py), and the next lookup reloads the snapshot.
+    The bump reaches other processes only through a shared cache (CACHE_URL); as a bound for
+    bumps that do not reach a process, a snapshot is also reloaded once it is older than
+    PRICE_CATALOG_MAX_AGE seconds.
+    Writes that bypass model signals (queryset.update, bulk_create) must call invalidate().
+    """
+    version_key = 'crm_core:price_catalog:version'
+
+    def __init__(self, cache_alias='default'):
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def current_version(self):
+        # A fresh time-based token if the key was never set or got evicted
+        return self.cache.get_or_set(self.version_key, time.time_ns(), timeout=None)
+
+    def is_current(self, snapshot, version):
+        max_age = getattr(settings, 'PRICE_CATALOG_MAX_AGE', 60)
+        return (
+            snapshot is not None and snapshot.version == version
+            and time.monotonic() - snapshot.loaded_at < max_age
+        )
+
+    def snapshot(self):
+        """Returns the current snapshot, reloading it if the catalog changed since it was built."""
+        version = self.current_version()
+        snapshot = self._snapshot
+        if self.is_current(snapshot, version):
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        return self.refresh(version=version)
+
+    async def asnapshot(self):
+        """Async variant of snapshot(); only a cold or stale catalog leaves the event loop's thread."""
+        version = await self.cache.aget_or_set(self.version_key, time.time_ns(), timeout=None)
+        snapshot = self._snapshot
+        if self.is_current(snapshot, version):
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        return await sync_to_async(self.refresh)(version=version)
+
+    def refresh(self, product_ids=None, version=None):
+        """
+        Bulk refresh: reloads the whole catalog, or only the given products into the
+        current snapshot. Returns the new snapshot.
+        """
+        if version is None:
+            version = self.current_version()
+        if self._snapshot is None:
+            product_ids = None
+        products, size_prices = load_catalog(product_ids)
+        loaded_at = None
+        with self._lock:
+            current = self._snapshot
+            if product_ids is not None and current is not None:
+                ids = {int(pid) for pid in product_ids}
+                merged_products = {pid: p for pid, p in current.products.items() if pid not in ids}
+                merged_products.update(products)
+                merged_sizes = {k: v for k, v in current.size_prices.items() if k[0] not in ids}
+                merged_sizes.update(size_prices)
+                products, size_prices = merged_products, merged_sizes
+                # Still due for a full reload at the same time
+                version, loaded_at = current.version, current.loaded_at
+            self._snapshot = CatalogSnapshot(version, products, size_prices, loaded_at)
+            return self._snapshot
+
+    def invalidate(self):
+        """Marks every cached snapshot stale, again once the current transaction commits."""
+        self._bump_version()
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.set(self.version_key, time.time_ns(), timeout=None)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'version': snapshot.version if snapshot else None,
+            'products': len(snapshot.products) if snapshot else 0,
+        }
+
+
+price_catalog = PriceCatalog()
@@ -0,0 +1,58 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_PREFIX = 'replica_'
+
+_primary_reads = ContextVar('primary_reads', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def read_alias():
+    """
+    Database for the GET list/detail views: a random read replica when any is configured
+    (REPLICA_DATABASE_URLS), else the primary. Replicas may lag, so only reads that tolerate
+    slightly stale rows belong there. Inside primary_reads() it is always the primary.
+    """
+    if _primary_reads.get():
+        return 'default'
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else 'default'
+
+
+@contextmanager
+def primary_reads():
+    """Sends read_alias() reads to the primary, e.g. while replicas may not have a write yet."""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Writes, migrations and every read that does not opt in go to the primary. Reads pinned to a
+    replica with queryset.using(read_alias()) keep their related lookups and prefetches there,
+    since Django follows the instance's database for those.
+    """
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
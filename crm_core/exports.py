@@ -0,0 +1,143 @@
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Contact, Order, OrderItem, Product
+from .serializers import ContactReadSerializer, OrderReadSerializer, ProductReadSerializer
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_CSV_COLUMNS = [
+    'order_id', 'order_no', 'created_at', 'contact_id', 'contact_name',
+    'item_id', 'product_id', 'product_name', 'size_name', 'qty',
+    'unit_price', 'line_total', 'extras', 'customization',
+]
+CONTACT_CSV_COLUMNS = [
+    'id', 'first_name', 'last_name', 'email', 'phone', 'organization', 'organization_name',
+]
+PRODUCT_CSV_COLUMNS = [
+    'id', 'name', 'sku', 'base_price', 'offer_percent', 'size_id', 'size_name', 'size_price',
+]
+
+
+def parse_date_bound(value, end_of_day=False):
+    """
+    Parses an ISO date or datetime query parameter into an aware datetime.
+    A bare date means the start of that day, or its end when end_of_day is set.
+    """
+    try:
+        day = parse_date(value)
+        parsed = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = parsed = None
+    if day is not None:
+        parsed = datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+    if parsed is None:
+        raise ValidationError({'error': f"Invalid date: {value}"})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_orders(queryset, params, field='created_at'):
+    """
+    Applies the date_from / date_to filters (both inclusive) on Order.created_at,
+    reached through `field` (e.g. 'order__created_at' for OrderItem querysets).
+    """
+    if params.get('date_from'):
+        queryset = queryset.filter(**{f'{field}__gte': parse_date_bound(params['date_from'])})
+    if params.get('date_to'):
+        queryset = queryset.filter(**{f'{field}__lte': parse_date_bound(params['date_to'], end_of_day=True)})
+    return queryset
+
+
+def export_orders(params):
+    queryset = Order.objects.select_related('contact').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+    )
+    return filter_orders(queryset, params).order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_contacts(params):
+    return Contact.objects.select_related('organization').order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def export_products(params):
+    return Product.objects.prefetch_related('sizes').order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def order_csv_rows(orders):
+    # One row per order line; orders without lines still get a row
+    serializer = OrderReadSerializer()
+    for order in orders:
+        data = serializer.to_representation(order)
+        head = [data['id'], data['order_no'], data['created_at'], data['contact'], data['contact_name']]
+        if not data['items']:
+            yield head + [''] * (len(ORDER_CSV_COLUMNS) - len(head))
+        for item in data['items']:
+            yield head + [
+                item['id'], item['product'], item['product_name'], item['size_name'], item['qty'],
+                item['unit_price'], item['line_total'], json.dumps(item['extras']), item['customization'] or '',
+            ]
+
+
+def contact_csv_rows(contacts):
+    serializer = ContactReadSerializer()
+    for contact in contacts:
+        data = serializer.to_representation(contact)
+        yield [data[column] for column in CONTACT_CSV_COLUMNS]
+
+
+def product_csv_rows(products):
+    serializer = ProductReadSerializer()
+    for product in products:
+        data = serializer.to_representation(product)
+        head = [data['id'], data['name'], data['sku'], data['base_price'], data['offer_percent']]
+        if not data['sizes']:
+            yield head + ['', '', '']
+        for size in data['sizes']:
+            yield head + [size['id'], size['size_name'], size['price']]
+
+
+class Echo:
+    """File-like object whose write() returns the line instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(serializer_class, instances):
+    serializer = serializer_class()
+    for instance in instances:
+        yield json.dumps(serializer.to_representation(instance), cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORTS = {
+    'orders': (export_orders, OrderReadSerializer, ORDER_CSV_COLUMNS, order_csv_rows),
+    'contacts': (export_contacts, ContactReadSerializer, CONTACT_CSV_COLUMNS, contact_csv_rows),
+    'products': (export_products, ProductReadSerializer, PRODUCT_CSV_COLUMNS, product_csv_rows),
+}
+
+
+def stream_export(resource, export_format, params):
+    """
+    Returns a generator of NDJSON lines or CSV rows for the resource.
+    The queryset is built (and filters validated) eagerly; rows are read lazily in chunks.
+    """
+    load, serializer_class, columns, csv_rows = EXPORTS[resource]
+    instances = load(params)
+    if export_format == 'csv':
+        return stream_csv(columns, csv_rows(instances))
+    return stream_ndjson(serializer_class, instances)
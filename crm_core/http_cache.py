@@ -0,0 +1,136 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db_routers import primary_reads
+from .models import Contact, Order, OrderItem, Organization, Product, SizePrice
+
+# resource -> models whose rows appear in its responses (directly or as nested names)
+RESOURCE_MODELS = {
+    'organizations': (Organization,),
+    'contacts': (Contact, Organization),
+    'products': (Product, SizePrice),
+    'orders': (Order, OrderItem, Contact, Product),
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def version_key(resource):
+    return f'crm_core:http_cache:version:{resource}'
+
+
+def written_key(resource):
+    return f'crm_core:http_cache:written:{resource}'
+
+
+def resource_version(resource):
+    """
+    Current version of a resource: the time_ns of its last change, or of the first read when the
+    key was never set or got evicted. Doubles as the Last-Modified time.
+    """
+    return get_cache().get_or_set(version_key(resource), time.time_ns(), timeout=None)
+
+
+def recently_written(*resources):
+    """Whether any of the resources changed within REPLICA_MAX_LAG, so replicas may not have the write yet."""
+    return bool(get_cache().get_many([written_key(resource) for resource in resources]))
+
+
+def bump(*resources):
+    cache = get_cache()
+    cache.set_many({version_key(resource): time.time_ns() for resource in resources}, timeout=None)
+    cache.set_many({written_key(resource): True for resource in resources}, timeout=getattr(settings, 'REPLICA_MAX_LAG', 5))
+
+
+def invalidate_model(model):
+    """
+    Marks every resource showing `model` as changed, again once the current transaction commits,
+    so a response cached from a read that raced the write is not served under the new version.
+    Called from signals; writes that bypass them (bulk_create, queryset.update) must call it too.
+    """
+    resources = [resource for resource, models in RESOURCE_MODELS.items() if model in models]
+    if resources:
+        bump(*resources)
+        transaction.on_commit(lambda: bump(*resources))
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GETs and a shared response cache for list and retrieve views.
+
+    The ETag covers the resource version, the absolute request URL and the negotiated format, so
+    any write to a model in RESOURCE_MODELS[cache_resource] changes every ETag of the resource. A matching If-None-Match
+    (or an If-Modified-Since not older than the version) gets a 304 before the view touches the
+    ORM; otherwise the serialized data is served from, or stored in, the response cache.
+    Every authenticated user sees the same rows, so entries are shared between users.
+
+    Last-Modified has one second resolution, so it is only sent, and If-Modified-Since only
+    honored, once the version's second is over: a later write then always lands in a later second.
+    Data for a resource written within REPLICA_MAX_LAG is read from the primary, so a lagging
+    replica cannot get pre-write rows cached under the new version.
+    """
+    cache_resource = None
+
+    def get_cache_version(self):
+        return resource_version(self.cache_resource)
+
+    def written_recently(self):
+        return recently_written(self.cache_resource)
+
+    def build_response(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        version = self.get_cache_version()
+        url = request.build_absolute_uri()
+        etag = '"%s-%s-%s-%s"' % (
+            self.cache_resource, version, hashlib.md5(url.encode()).hexdigest()[:16], request.accepted_renderer.format,
+        )
+        last_modified = version // 1_000_000_000
+        settled = last_modified < int(time.time())
+        headers = {
+            'ETag': etag,
+            # Clients may keep the response but must revalidate it on every use
+            'Cache-Control': 'private, no-cache',
+            'Vary': 'Accept',
+        }
+        if settled:
+            headers['Last-Modified'] = http_date(last_modified)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Weak comparison: CompressionMiddleware sends compressed bodies with W/ ETags
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            if etag in tags or if_none_match.strip() == '*':
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        elif settled:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            if since is not None and last_modified <= since:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response_cache = get_cache()
+        cache_key = f'crm_core:http_cache:response:{etag}'
+        data = response_cache.get(cache_key)
+        if data is None:
+            if self.written_recently():
+                with primary_reads():
+                    response = self.build_response(request, *args, **kwargs)
+            else:
+                response = self.build_response(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            response_cache.set(cache_key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+        else:
+            response = Response(data)
+        for name, value in headers.items():
+            response[name] = value
+        return response
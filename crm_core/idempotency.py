@@ -0,0 +1,86 @@
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+
+def lock_timeout():
+    # An unfinished key older than this belongs to a request that died; a retry may take it over
+    return datetime.timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder).encode()
+    ).hexdigest()
+
+
+def claim(user, key, fingerprint):
+    """
+    Write-ahead claim of an idempotency key, committed before any work is done.
+    Returns (record, None) when this request now owns the key, or (None, response) to send
+    instead: the stored response of a finished duplicate, 409 while the first request is still
+    running, or 422 when the key was already used for a different request body.
+    """
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user_id=user.pk, key=key, fingerprint=fingerprint), None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user_id=user.pk, key=key).first()
+        if existing is None:
+            continue  # purged meanwhile
+        age = timezone.now() - existing.created_at
+        if age > key_ttl() or (existing.response_status is None and age > lock_timeout()):
+            # Expired, or abandoned mid-request: only one concurrent retry deletes it and re-claims
+            IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+            continue
+        if existing.fingerprint != fingerprint:
+            return None, Response(
+                {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if existing.response_status is None:
+            return None, Response(
+                {'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return None, Response(existing.response_body, status=existing.response_status,
+                              headers={'Idempotent-Replayed': 'true'})
+    return None, Response({'error': f'Could not claim {IDEMPOTENCY_HEADER}'}, status=status.HTTP_409_CONFLICT)
+
+
+def complete(record, response_status, body):
+    """Stores the response; call it inside the transaction that does the work so both commit together."""
+    IdempotencyKey.objects.filter(pk=record.pk).update(response_status=response_status, response_body=body)
+
+
+def release(record):
+    """Frees the key after a failed request so a retry runs again."""
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def purge_expired(batch_size=5000):
+    """Deletes expired keys in batches; returns how many were removed."""
+    cutoff = timezone.now() - key_ttl()
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,205 @@
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .catalog import price_catalog
+from .http_cache import invalidate_model
+from .search import reindex
+from .stats import recount
+from .sync import touch
+from .models import Contact, Order, Organization, Product, SizePrice
+from .serializers import ContactImportSerializer, OrganizationImportSerializer, ProductImportSerializer
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def read_rows(lines, import_format):
+    """
+    Yields row dicts from an iterable of text lines in 'csv' or 'ndjson' format.
+    Empty CSV cells are dropped so optional columns fall back to their defaults.
+    """
+    if import_format == 'csv':
+        for row in csv.DictReader(lines):
+            yield {key: value for key, value in row.items() if key and value not in ('', None)}
+    else:
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield {'__error__': 'Invalid JSON'}
+
+
+def validate_batch(rows, serializer_class, first_row):
+    """
+    Validates each row on its own; returns (valid [(row_no, data)], errors [{'row', 'errors'}]).
+    Rows are numbered from 1 across the whole import.
+    """
+    valid, errors = [], []
+    for row_no, row in enumerate(rows, start=first_row):
+        if not isinstance(row, dict) or '__error__' in row:
+            message = row['__error__'] if isinstance(row, dict) else 'Expected an object'
+            errors.append({'row': row_no, 'errors': {'non_field_errors': [message]}})
+            continue
+        serializer = serializer_class(data=row)
+        if serializer.is_valid():
+            valid.append((row_no, serializer.validated_data))
+        else:
+            errors.append({'row': row_no, 'errors': serializer.errors})
+    return valid, errors
+
+
+def last_by_key(valid, key):
+    # Upserts may not touch the same row twice in one statement: the last occurrence wins
+    return list({data[key]: data for _, data in valid}.values())
+
+
+def resolve_organizations(names):
+    """
+    Maps organization names to ids, creating the missing ones: two or three queries per batch.
+    """
+    names = set(names)
+    ids = {}
+    for org_id, name in Organization.objects.filter(name__in=names).order_by('-id').values_list('id', 'name'):
+        ids[name] = org_id  # lowest id wins for duplicate names
+    missing = names - ids.keys()
+    if missing:
+        Organization.objects.bulk_create([Organization(name=name) for name in missing])
+        ids.update(Organization.objects.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def import_organizations(valid):
+    rows = last_by_key(valid, 'name')
+    existing = {}
+    for org in Organization.objects.filter(name__in=[r['name'] for r in rows]).order_by('-id'):
+        existing[org.name] = org
+    to_update, to_create = [], []
+    now = timezone.now()
+    for data in rows:
+        org = existing.get(data['name'])
+        if org is None:
+            to_create.append(Organization(**data))
+        else:
+            org.address = data.get('address', org.address)
+            org.gst_no = data.get('gst_no', org.gst_no)
+            org.updated_at = now
+            to_update.append(org)
+    Organization.objects.bulk_create(to_create)
+    Organization.objects.bulk_update(to_update, ['address', 'gst_no', 'updated_at'])
+    # Names are the upsert key, so the contacts showing them need no reindex
+    reindex('organization', Organization.objects.filter(name__in=[r['name'] for r in rows]))
+
+
+def import_contacts(valid):
+    rows = last_by_key(valid, 'email')
+    org_ids = resolve_organizations(r['organization'] for r in rows)
+    old_names = dict(Contact.objects.filter(email__in=[r['email'] for r in rows]).values_list('email', 'first_name'))
+    Contact.objects.bulk_create(
+        [
+            Contact(organization_id=org_ids[data['organization']], **{k: v for k, v in data.items() if k != 'organization'})
+            for data in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['email'],
+        update_fields=['first_name', 'last_name', 'phone', 'organization', 'updated_at'],
+    )
+    # Orders show their contact's first name (see sync.py)
+    renamed = [r['email'] for r in rows if r['email'] in old_names and old_names[r['email']] != r['first_name']]
+    if renamed:
+        touch(Order, contact__email__in=renamed)
+    reindex('contact', Contact.objects.select_related('organization').filter(email__in=[r['email'] for r in rows]))
+    reindex('organization', Organization.objects.filter(id__in=set(org_ids.values())))
+
+
+def import_products(valid):
+    rows = last_by_key(valid, 'sku')
+    old_names = dict(Product.objects.filter(sku__in=[r['sku'] for r in rows]).values_list('sku', 'name'))
+    Product.objects.bulk_create(
+        [Product(**{k: v for k, v in data.items() if k != 'sizes'}) for data in rows],
+        update_conflicts=True,
+        unique_fields=['sku'],
+        update_fields=['name', 'base_price', 'offer_percent', 'updated_at'],
+    )
+    renamed = [r['sku'] for r in rows if r['sku'] in old_names and old_names[r['sku']] != r['name']]
+    if renamed:
+        touch(Order, items__product__sku__in=renamed)
+    reindex('product', Product.objects.filter(sku__in=[r['sku'] for r in rows]))
+
+    sized = [data for data in rows if 'sizes' in data]
+    if sized:
+        product_ids = dict(Product.objects.filter(sku__in=[d['sku'] for d in sized]).values_list('sku', 'id'))
+        existing = {
+            (size.product_id, size.size_name): size
+            for size in SizePrice.objects.filter(product_id__in=product_ids.values())
+        }
+        to_update, to_create = [], []
+        now = timezone.now()
+        for data in sized:
+            product_id = product_ids[data['sku']]
+            for size_name, price in {s['size_name']: s['price'] for s in data['sizes']}.items():
+                current = existing.get((product_id, size_name))
+                if current is None:
+                    to_create.append(SizePrice(product_id=product_id, size_name=size_name, price=price))
+                else:
+                    current.price = price
+                    current.updated_at = now
+                    to_update.append(current)
+        SizePrice.objects.bulk_create(to_create)
+        SizePrice.objects.bulk_update(to_update, ['price', 'updated_at'])
+
+    # bulk_create/bulk_update skip model signals
+    price_catalog.invalidate()
+
+
+# resource -> (row serializer, importer, dashboard counters to recount afterwards)
+IMPORTERS = {
+    'organizations': (OrganizationImportSerializer, import_organizations, ['total_organizations']),
+    'contacts': (ContactImportSerializer, import_contacts, ['total_contacts', 'total_organizations']),
+    'products': (ProductImportSerializer, import_products, ['total_products']),
+}
+
+
+# resource -> models whose cached API responses an import can change
+IMPORTED_MODELS = {
+    'organizations': (Organization,),
+    'contacts': (Contact, Organization),
+    'products': (Product, SizePrice),
+}
+
+
+def import_rows(resource, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Bulk imports an iterable of row dicts in batches.
+    Invalid rows are reported and skipped; each batch of valid rows is written in its own
+    transaction, so a database error only fails that batch.
+    Returns {'imported': <rows written>, 'errors': [{'row': n, 'errors': {...}}]}.
+    """
+    serializer_class, importer, counters = IMPORTERS[resource]
+    rows = iter(rows)
+    imported, errors = 0, []
+    first_row = 1
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        valid, batch_errors = validate_batch(batch, serializer_class, first_row)
+        errors.extend(batch_errors)
+        if valid:
+            try:
+                with transaction.atomic():
+                    importer(valid)
+                imported += len(valid)
+            except Exception as e:
+                errors.extend({'row': row_no, 'errors': {'non_field_errors': [str(e)]}} for row_no, _ in valid)
+        first_row += len(batch)
+    # Bulk writes skip the signals that keep the dashboard counters up to date; the importers
+    # reindex the search documents of the rows they write themselves
+    recount(*counters)
+    if imported:
+        for model in IMPORTED_MODELS[resource]:
+            invalidate_model(model)
+    return {'imported': imported, 'errors': errors}
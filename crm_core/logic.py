@@ -1,19 +1,18 @@
-import datetime
-import uuid
-from decimal import Decimal
-from .models import SizePrice, Order
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import transaction, IntegrityError
+from .models import Order, OrderItem
+from .catalog import price_catalog
+from .order_numbers import get_generator
+from .tasks import schedule_rollup_refresh
 
 def calculate_item_price(product, size_name):
     """
     Price calculation logic:
     - If SizePrice exists for the chosen size_name, use size_price.price.
     - If no SizePrice found, fall back to product.base_price.
+    Served from the in-process price catalog (see catalog.py).
     """
-    try:
-        size_price_obj = SizePrice.objects.get(product=product, size_name=size_name)
-        return size_price_obj.price
-    except SizePrice.DoesNotExist:
-        return product.base_price
+    return price_catalog.snapshot().unit_price(product.id, size_name)
 
 def apply_offer(unit_price, offer_percent):
     """
@@ -25,14 +24,137 @@ def apply_offer(unit_price, offer_percent):
         return unit_price * (Decimal(1) - discount)
     return unit_price
 
+def price_items(items, snapshot=None):
+    """
+    Prices a whole (already merged) cart in memory:
+    - Reads effective (offer applied, rounded to cents) unit prices from one price catalog snapshot, so a warm
+      catalog needs no queries at all and a cold one loads in two.
+    - Applies the same fallback and offer rules as calculate_item_price/apply_offer.
+    Returns a list of (item, catalog_product, unit_price_after_offer, line_total) in cart order.
+    Raises Product.DoesNotExist for unknown product ids.
+    """
+    if snapshot is None:
+        snapshot = price_catalog.snapshot()
+    priced = []
+    for item in items:
+        product = snapshot.product(item['product_id'])
+        unit_price_after_offer = snapshot.effective_price(product.id, item['size_name'])
+        line_total = item.get('qty', 1) * unit_price_after_offer
+        priced.append((item, product, unit_price_after_offer, line_total))
+    return priced
+
+CENT = Decimal('0.01')
+QUOTE_MAX_LINES = 10000
+
+def round_money(value):
+    """Rounds to cents, half up. Used for the effective unit prices of the price catalog."""
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def quote_items(lines, snapshot=None):
+    """
+    Prices a batch of {'product_id', 'size_name', 'qty'} lines for a quote, without writing anything:
+    - All lines are priced from one price catalog snapshot (no queries when warm, two when cold).
+    - Each distinct (product, size) is priced once, however many lines repeat it.
+    - Unit prices come rounded to cents, as for orders (see price_items), so line totals and the total
+      add up exactly and match the order the same cart creates.
+    Returns (quoted, total) where quoted is a list of (product, size_name, qty, unit_price, line_total)
+    in input order. Raises Product.DoesNotExist for unknown product ids.
+    """
+    if snapshot is None:
+        snapshot = price_catalog.snapshot()
+    unit_prices = {}
+    quoted = []
+    total = Decimal(0)
+    for line in lines:
+        key = (int(line['product_id']), line['size_name'])
+        unit_price = unit_prices.get(key)
+        if unit_price is None:
+            unit_price = unit_prices[key] = snapshot.effective_price(*key)
+        qty = line.get('qty', 1)
+        line_total = unit_price * qty
+        total += line_total
+        quoted.append((snapshot.products[key[0]], key[1], qty, unit_price, line_total))
+    return quoted, total
+
+ORDER_NUMBER_ATTEMPTS = 3
+
+def create_order(contact_id, priced_items, order_total, on_created=None):
+    """
+    Writes the order and its lines in one transaction. The order number is generated before
+    the transaction opens; if it still collides with an existing one the write is retried
+    with a fresh number. on_created(order) runs inside the transaction, after the lines.
+    Follow-up work is queued for the worker on commit (see tasks.py), not run here.
+    """
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        order_no = generate_order_number()
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_no=order_no,
+                    contact_id=contact_id,
+                    total=order_total,
+                    line_count=len(priced_items)
+                )
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product_id=product.id,
+                        size_name=item['size_name'],
+                        qty=item.get('qty', 1),
+                        unit_price=unit_price_after_offer,
+                        line_total=line_total,
+                        extras=item.get('extras', {}),
+                        customization=item.get('customization', '')
+                    )
+                    for item, product, unit_price_after_offer, line_total in priced_items
+                ])
+                if on_created is not None:
+                    on_created(order)
+                schedule_rollup_refresh()
+            return order
+        except IntegrityError:
+            if attempt == ORDER_NUMBER_ATTEMPTS - 1 or not Order.objects.filter(order_no=order_no).exists():
+                raise
+
 def generate_order_number():
     """
-    Provide readable order_no e.g. ORD-20250612-0001 or UUID - consistent and unique.
-    Using format: ORD-YYYYMMDD-UUID_SHORT
+    Provide readable order_no e.g. ORD-20250612-0KZ3C1G0 - consistent and unique.
+    Using format: ORD-YYYYMMDD-XXXXXXXX, where the suffix comes from the generator configured in
+    settings.ORDER_NUMBER_GENERATOR (time-ordered by default, see order_numbers.py).
+    """
+    return get_generator()()
+
+def normalize_extras(value):
+    """
+    Builds a canonical, hashable form of an extras value:
+    - dicts become key-sorted tuples, lists become sorted tuples (extras are unordered),
+      recursively for nested values.
+    - Every value is tagged with its kind so mixed-type lists sort and 1 != "1".
     """
-    date_str = datetime.datetime.now().strftime('%Y%m%d')
-    unique_suffix = str(uuid.uuid4())[:8].upper()
-    return f"ORD-{date_str}-{unique_suffix}"
+    if isinstance(value, dict):
+        return ('d', tuple(sorted((str(k), normalize_extras(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ('l', tuple(sorted(normalize_extras(v) for v in value)))
+    if value is None:
+        return ('0', None)
+    if isinstance(value, bool):
+        return ('b', value)
+    if isinstance(value, (int, float, Decimal)):
+        return ('n', value)
+    if isinstance(value, str):
+        return ('s', value)
+    return ('r', repr(value))
+
+def cart_line_key(item):
+    """
+    Merge key for a cart line: product id, size_name, normalized extras and customization.
+    """
+    return (
+        item['product_id'],
+        item['size_name'],
+        normalize_extras(item.get('extras', {})),
+        item.get('customization', ''),
+    )
 
 def get_normalized_items(items):
     """
@@ -40,40 +162,22 @@ def get_normalized_items(items):
     Two items should be merged into a single line only if all of the following are identical:
     - product id
     - size_name
-    - extras (normalized/sorted if array)
+    - extras (normalized/sorted, including nested values)
     - customization (exact string)
+    Merges in a single pass keyed on cart_line_key, keeping first-seen order.
+    The caller's dicts are left untouched; merged lines are copies.
     """
-    merged_items = []
-    
+    merged = {}
+
     for item in items:
-        # Normalize extras (assuming it's a list or dict)
-        extras = item.get('extras', {})
-        if isinstance(extras, dict):
-            # Sort dict by keys to ensure consistency
-            normalized_extras = dict(sorted(extras.items()))
-        elif isinstance(extras, list):
-            # Sort list if it contains sortable items
-            try:
-                normalized_extras = sorted(extras)
-            except TypeError:
-                normalized_extras = extras
+        key = cart_line_key(item)
+        qty = item.get('qty', 1)
+        line = merged.get(key)
+        if line is None:
+            line = dict(item)
+            line['qty'] = qty
+            merged[key] = line
         else:
-            normalized_extras = extras
+            line['qty'] += qty
 
-        item['normalized_extras'] = normalized_extras
-        
-        found = False
-        for m_item in merged_items:
-            if (m_item['product_id'] == item['product_id'] and
-                m_item['size_name'] == item['size_name'] and
-                m_item['normalized_extras'] == item['normalized_extras'] and
-                m_item.get('customization', '') == item.get('customization', '')):
-                
-                m_item['qty'] += item.get('qty', 1)
-                found = True
-                break
-        
-        if not found:
-            merged_items.append(item)
-            
-    return merged_items
+    return list(merged.values())
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from crm_core.stats import compact_counters, compact_rollups, recount
+
+
+class Command(BaseCommand):
+    help = "Fold dashboard counter deltas and new orders into the stats rollups. Run periodically (e.g. cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help="Reset counters to exact COUNT(*) values first.")
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            recount()
+        orders = compact_rollups()
+        compact_counters()
+        self.stdout.write(self.style.SUCCESS(f"Compacted counters, folded {orders} orders into rollups"))
@@ -0,0 +1,36 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm_core.imports import IMPORT_BATCH_SIZE, IMPORTERS, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import organizations, contacts or products from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--max-errors', type=int, default=20, help="Row errors to print.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        import_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        start = time.perf_counter()
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                result = import_rows(options['resource'], read_rows(f, import_format), options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors'][:options['max_errors']]:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        rate = result['imported'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} {options['resource']} "
+            f"({len(result['errors'])} errors) in {elapsed:.2f}s, {rate:.0f} rows/s"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crm_core.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Delete delete-tracking tombstones older than SYNC_TOMBSTONE_TTL. Run periodically (e.g. cron)."
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tombstones"))
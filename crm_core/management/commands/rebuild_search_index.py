@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from crm_core.search import SEARCH_TYPES, reindex
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents for contacts, organizations and products, e.g. after raw SQL writes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', choices=sorted(SEARCH_TYPES), help="Default: all")
+
+    def handle(self, *args, **options):
+        for search_type in options['types'] or sorted(SEARCH_TYPES):
+            reindex(SEARCH_TYPES[search_type])
+            self.stdout.write(self.style.SUCCESS(f"Reindexed {search_type}"))
@@ -0,0 +1,57 @@
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from crm_core.tasks import claim_batch, run_batch, worker_id
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (see crm_core/tasks.py) until stopped with SIGINT/SIGTERM."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', choices=('thread', 'process'), default='thread',
+                            help="thread for I/O-bound tasks, process for CPU-bound ones")
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=None, help="tasks claimed per poll; default: 2 x concurrency")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="seconds to sleep when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="run one batch and exit")
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        batch_size = options['batch_size'] or concurrency * 2
+        locked_by = worker_id()
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        if options['pool'] == 'process':
+            # Forked children must not share the parent's database connection
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=django.setup)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        total_done = total_failed = 0
+        with executor:
+            while not self.stopping:
+                tasks = claim_batch(batch_size, locked_by)
+                if tasks:
+                    done, failed = run_batch(executor, tasks)
+                    total_done += done
+                    total_failed += failed
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"Ran {len(tasks)} tasks: {done} done, {failed} failed")
+                if options['once']:
+                    break
+                if len(tasks) < batch_size:
+                    time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f"Worker stopped: {total_done} tasks done, {total_failed} failed"))
+
+    def stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self.stopping = True
@@ -0,0 +1,118 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .perf import RequestMetrics, current_metrics, perf_registry
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+logger = logging.getLogger('crm_core.perf')
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+class PerformanceMiddleware:
+    """
+    Measures every request: wall time, database queries and time, serializer time and response
+    size. Adds a Server-Timing header and records the values per view name in perf_registry
+    (read them from GET /api/admin/perf/).
+
+    With PERF_DETECT_N_PLUS_ONE on, a request that runs the same SQL shape
+    PERF_N_PLUS_ONE_THRESHOLD times or more is logged to the crm_core.perf logger.
+    Put it first in MIDDLEWARE so the wall time covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.detect_n_plus_one = getattr(settings, 'PERF_DETECT_N_PLUS_ONE', False)
+        self.n_plus_one_threshold = getattr(settings, 'PERF_N_PLUS_ONE_THRESHOLD', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, stack, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stack.close()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, stack, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stack.close()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def start(self):
+        metrics = RequestMetrics(track_shapes=self.detect_n_plus_one)
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        token = current_metrics.set(metrics)
+        return metrics, stack, token, time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = metrics.db_time * 1000
+        serializer_ms = metrics.serializer_time * 1000
+        response['Server-Timing'] = (
+            f'total;dur={wall_ms:.2f}, db;dur={db_ms:.2f};desc="{metrics.queries} queries", '
+            f'serializer;dur={serializer_ms:.2f}'
+        )
+
+        values = {'wall_ms': wall_ms, 'db_ms': db_ms, 'queries': metrics.queries, 'serializer_ms': serializer_ms}
+        if not response.streaming:
+            values['bytes'] = len(response.content)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        repeated = metrics.repeated_shapes(self.n_plus_one_threshold)
+        for sql, count in repeated:
+            logger.warning("Possible N+1 in %s %s (%s): query ran %d times: %s",
+                           request.method, request.path, view_name, count, sql)
+        perf_registry.record(view_name, values, n_plus_one=bool(repeated))
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses responses of at least COMPRESSION_MIN_SIZE bytes: brotli when the client accepts it
+    and the brotli package is installed, gzip otherwise (Django's GZipMiddleware, which also gzips
+    streamed exports on the fly). Strong ETags become weak, as the encoded bytes differ.
+    Put it right after PerformanceMiddleware so the recorded response size is the one sent.
+    """
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        if (brotli is None or response.streaming or response.has_header('Content-Encoding')
+                or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
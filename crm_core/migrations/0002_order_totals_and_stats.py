@@ -0,0 +1,72 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:52
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals_and_counters(apps, schema_editor):
+    Order = apps.get_model('crm_core', 'Order')
+    OrderItem = apps.get_model('crm_core', 'OrderItem')
+    StatCounter = apps.get_model('crm_core', 'StatCounter')
+
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).values('order')
+    Order.objects.update(
+        total=Coalesce(
+            Subquery(lines.annotate(s=Sum('line_total')).values('s')),
+            Value(0), output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        line_count=Coalesce(Subquery(lines.annotate(c=Count('id')).values('c')), Value(0)),
+    )
+
+    counters = {
+        'total_organizations': apps.get_model('crm_core', 'Organization').objects.count(),
+        'total_contacts': apps.get_model('crm_core', 'Contact').objects.count(),
+        'total_products': apps.get_model('crm_core', 'Product').objects.count(),
+        'total_orders': Order.objects.count(),
+        'total_revenue': Order.objects.aggregate(s=Sum('total'))['s'] or 0,
+    }
+    StatCounter.objects.bulk_create([StatCounter(name=name, value=value) for name, value in counters.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=50)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('day', 'Day'), ('product', 'Product'), ('organization', 'Organization')], max_length=20)),
+                ('key', models.CharField(max_length=64)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='unique_revenue_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_totals_and_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:54
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_sizes(apps, schema_editor):
+    # Keep the newest SizePrice per (product, size_name) so the unique constraint can be added
+    SizePrice = apps.get_model('crm_core', 'SizePrice')
+    keep = SizePrice.objects.values('product', 'size_name').annotate(keep_id=Max('id')).values('keep_id')
+    SizePrice.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_core', '0002_order_totals_and_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['last_name', 'first_name'], name='contact_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['organization', 'last_name'], name='contact_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['order', 'product'], name='orderitem_order_product_idx'),
+        ),
+        migrations.RunPython(drop_duplicate_sizes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sizeprice',
+            constraint=models.UniqueConstraint(fields=('product', 'size_name'), name='unique_size_per_product'),
+        ),
+    ]
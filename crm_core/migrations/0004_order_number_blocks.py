@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_core', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+    ]
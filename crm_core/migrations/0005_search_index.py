@@ -0,0 +1,121 @@
+# Generated by Django 6.0.2 on 2026-10-18 18:00
+
+from django.db import OperationalError, migrations, models
+
+SQLITE_FTS = [
+    # External content table: FTS5 stores only the index and reads title/body from crm_core_searchentry
+    """CREATE VIRTUAL TABLE crm_core_searchentry_fts USING fts5(
+        title, body, content='crm_core_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER crm_core_searchentry_ai AFTER INSERT ON crm_core_searchentry BEGIN
+        INSERT INTO crm_core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER crm_core_searchentry_ad AFTER DELETE ON crm_core_searchentry BEGIN
+        INSERT INTO crm_core_searchentry_fts(crm_core_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER crm_core_searchentry_au AFTER UPDATE ON crm_core_searchentry BEGIN
+        INSERT INTO crm_core_searchentry_fts(crm_core_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO crm_core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS crm_core_searchentry_ai",
+    "DROP TRIGGER IF EXISTS crm_core_searchentry_ad",
+    "DROP TRIGGER IF EXISTS crm_core_searchentry_au",
+    "DROP TABLE IF EXISTS crm_core_searchentry_fts",
+]
+POSTGRESQL_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX searchentry_tsv_idx ON crm_core_searchentry USING GIN (to_tsvector('simple', title || ' ' || body))",
+    "CREATE INDEX searchentry_title_trgm_idx ON crm_core_searchentry USING GIN (title gin_trgm_ops)",
+]
+POSTGRESQL_INDEXES_DROP = [
+    "DROP INDEX IF EXISTS searchentry_tsv_idx",
+    "DROP INDEX IF EXISTS searchentry_title_trgm_idx",
+]
+
+
+def sqlite_has_fts5(connection):
+    # FTS5 is a compile time option; without it search.py falls back to LIKE queries
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        except OperationalError:
+            return False
+        cursor.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        statements = SQLITE_FTS if sqlite_has_fts5(connection) else []
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRESQL_INDEXES
+    else:
+        statements = []
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FTS_DROP, 'postgresql': POSTGRESQL_INDEXES_DROP}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def backfill_search_entries(apps, schema_editor):
+    # Same documents as crm_core.search builds, written with the historical models
+    SearchEntry = apps.get_model('crm_core', 'SearchEntry')
+    Organization = apps.get_model('crm_core', 'Organization')
+    Contact = apps.get_model('crm_core', 'Contact')
+    Product = apps.get_model('crm_core', 'Product')
+
+    def documents():
+        for org in Organization.objects.order_by('pk').iterator(chunk_size=2000):
+            yield 'organization', org.pk, org.name, org.address or '', f"{org.address or ''} {org.gst_no or ''}"
+        for contact in Contact.objects.select_related('organization').order_by('pk').iterator(chunk_size=2000):
+            digits = ''.join(c for c in contact.phone if c.isdigit())
+            org_name = contact.organization.name
+            yield ('contact', contact.pk, f"{contact.first_name} {contact.last_name}", f"{contact.email} · {org_name}",
+                   f"{contact.email} {contact.phone} {digits} {org_name}")
+        for product in Product.objects.order_by('pk').iterator(chunk_size=2000):
+            yield 'product', product.pk, product.name, product.sku, product.sku
+
+    batch = []
+    for kind, object_id, title, subtitle, body in documents():
+        batch.append(SearchEntry(kind=kind, object_id=object_id, title=title[:255], subtitle=subtitle[:255], body=body))
+        if len(batch) == 2000:
+            SearchEntry.objects.bulk_create(batch)
+            batch = []
+    SearchEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm_core', '0004_order_number_blocks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contact', 'Contact'), ('organization', 'Organization'), ('product', 'Product')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('subtitle', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_entries, migrations.RunPython.noop),
+    ]
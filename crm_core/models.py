@@ -7,11 +7,28 @@ class User(AbstractUser):
         ('manager', 'Manager'),
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='manager')
+    # Bumped when password, role or is_active change; tokens carrying an older version are rejected
+    token_version = models.PositiveIntegerField(default=0)
+
+    def check_password(self, raw_password):
+        # Lets bump_token_version tell the hash upgrade saved on login from a password change
+        self._checked_password = raw_password
+        try:
+            return super().check_password(raw_password)
+        finally:
+            del self._checked_password
 
 class Organization(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField(blank=True, null=True)
     gst_no = models.CharField(max_length=20, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # ?since= delta sync (see sync.py)
+            models.Index(fields=['updated_at', 'id'], name='org_updated_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -22,6 +39,14 @@ class Contact(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='contacts')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_name', 'first_name'], name='contact_name_idx'),
+            models.Index(fields=['organization', 'last_name'], name='contact_org_name_idx'),
+            models.Index(fields=['updated_at', 'id'], name='contact_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -31,6 +56,12 @@ class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True)
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     offer_percent = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -39,6 +70,15 @@ class SizePrice(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sizes')
     size_name = models.CharField(max_length=50)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'size_name'], name='unique_size_per_product'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='sizeprice_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.size_name}"
@@ -47,10 +87,50 @@ class Order(models.Model):
     order_no = models.CharField(max_length=50, unique=True)
     contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='orders')
     created_at = models.DateTimeField(auto_now_add=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination and date range filters
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='order_updated_id_idx'),
+        ]
 
     def __str__(self):
         return self.order_no
 
+class OrderNumberBlock(models.Model):
+    """
+    Next free per-day order number for order_numbers.SequenceGenerator, reserved in blocks.
+    """
+    day = models.DateField(unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.day}: {self.next_value}"
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of an order POST sent with an Idempotency-Key header, replayed to retries of the
+    same request (see idempotency.py). A row without response_status is still in progress.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.key}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -60,6 +140,122 @@ class OrderItem(models.Model):
     line_total = models.DecimalField(max_digits=10, decimal_places=2)
     extras = models.JSONField(default=dict, blank=True)
     customization = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'product'], name='orderitem_order_product_idx'),
+            models.Index(fields=['updated_at', 'id'], name='orderitem_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order.order_no} - {self.product.name}"
+
+class StatCounter(models.Model):
+    """
+    Dashboard counter deltas (see stats.py). Writes append a row instead of updating a shared one,
+    so concurrent orders never wait on each other; compact_stats folds them into one row per name.
+    """
+    name = models.CharField(max_length=50, db_index=True)
+    value = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+class RevenueRollup(models.Model):
+    """
+    Order revenue per day, product or organization, folded in by compact_stats. Deletes and order
+    line changes of orders already folded in refresh the rollups they count in (see signals.py).
+    """
+    DIMENSION_CHOICES = (
+        ('day', 'Day'),
+        ('product', 'Product'),
+        ('organization', 'Organization'),
+    )
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=64)
+    orders = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_revenue_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key}: {self.revenue}"
+
+class SearchEntry(models.Model):
+    """
+    One searchable document per contact, organization or product, kept in sync by signals
+    (see search.py). The full-text index over title and body is database specific: an FTS5
+    table on SQLite, GIN tsvector and trigram indexes on PostgreSQL.
+    """
+    KIND_CHOICES = (
+        ('contact', 'Contact'),
+        ('organization', 'Organization'),
+        ('product', 'Product'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_entry'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
+
+
+class Task(models.Model):
+    """
+    Background job queued by tasks.enqueue and run by `manage.py worker` (see tasks.py).
+    Finished tasks are deleted; failed ones stay for inspection.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due tasks
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class Tombstone(models.Model):
+    """
+    Deleted organization, contact, product or order, reported to ?since= delta sync clients
+    (see sync.py). Rows older than SYNC_TOMBSTONE_TTL are removed by purge_tombstones.
+    """
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'deleted_at'], name='tombstone_resource_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} {self.object_id}"
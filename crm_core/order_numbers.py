@@ -0,0 +1,134 @@
+import datetime
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Crockford base32: digits then letters in ASCII order, so fixed-width codes sort like the numbers
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+SUFFIX_LENGTH = 8 # ORD-YYYYMMDD-XXXXXXXX
+
+
+def encode_base32(value, length=SUFFIX_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class RandomGenerator:
+    """
+    Legacy format: 8 hex chars of a uuid4. Not sortable; relies on the retry in the order view.
+    """
+    def __call__(self):
+        date_str = datetime.datetime.now().strftime('%Y%m%d')
+        return f"ORD-{date_str}-{str(uuid.uuid4())[:8].upper()}"
+
+
+class TimeOrderedGenerator:
+    """
+    Snowflake-style order numbers, e.g. ORD-20250612-0KZ3C1G0.
+
+    The 40-bit suffix packs milliseconds since midnight (27 bits), the worker id (6 bits) and a
+    per-millisecond counter (7 bits), so numbers sort by creation time within and across days and
+    need no database round trip.
+
+    Two processes only avoid collisions if their worker ids (0-63) differ. serve.py gives its
+    workers ORDER_NUMBER_WORKER_ID plus their slot, which is distinct on one host only: other hosts
+    or containers need their own ORDER_NUMBER_WORKER_ID range. When it is unset the process id
+    modulo 64 is used, which two processes can share. A collision fails the insert on the unique
+    order_no and create_order retries with a fresh number.
+    """
+    WORKER_BITS = 6
+    COUNTER_BITS = 7
+
+    def __init__(self, worker_id=None):
+        if worker_id is None:
+            worker_id = getattr(settings, 'ORDER_NUMBER_WORKER_ID', None)
+        if worker_id is None:
+            worker_id = os.getpid()
+        self.worker_id = int(worker_id) % (1 << self.WORKER_BITS)
+        self._lock = threading.Lock()
+        self._day = None
+        self._ms = -1
+        self._counter = 0
+
+    def now(self):
+        return datetime.datetime.now()
+
+    def __call__(self):
+        now = self.now()
+        day = now.strftime('%Y%m%d')
+        ms = ((now.hour * 60 + now.minute) * 60 + now.second) * 1000 + now.microsecond // 1000
+        with self._lock:
+            if day == self._day and ms <= self._ms:
+                # Same millisecond, or the clock stepped back: keep counting from the last one
+                ms = self._ms
+                self._counter += 1
+                if self._counter >> self.COUNTER_BITS:
+                    # Counter exhausted: borrow the next millisecond
+                    ms += 1
+                    self._counter = 0
+            else:
+                self._counter = 0
+            self._day, self._ms = day, ms
+            value = (((ms << self.WORKER_BITS) | self.worker_id) << self.COUNTER_BITS) | self._counter
+        return f"ORD-{day}-{encode_base32(value)}"
+
+
+class SequenceGenerator:
+    """
+    Per-day sequential order numbers, e.g. ORD-20250612-00000042.
+
+    Each process reserves blocks of `block_size` numbers from OrderNumberBlock and hands them out
+    from memory, so only one in `block_size` orders touches the database. Numbers left in a block
+    when a process exits are skipped, so the sequence can have gaps.
+    Block reservation runs in its own transaction when called outside one; call it before opening
+    the order transaction so the block row lock is not held while the order is written.
+    """
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 100)
+        self._lock = threading.Lock()
+        self._day = None
+        self._next = self._end = 0
+
+    def allocate_block(self, day):
+        from .models import OrderNumberBlock
+
+        with transaction.atomic():
+            block, _ = OrderNumberBlock.objects.select_for_update().get_or_create(day=day)
+            start = block.next_value
+            block.next_value = start + self.block_size
+            block.save(update_fields=['next_value'])
+        return start, start + self.block_size
+
+    def __call__(self):
+        today = datetime.date.today()
+        with self._lock:
+            if today != self._day or self._next >= self._end:
+                self._next, self._end = self.allocate_block(today)
+                self._day = today
+            value = self._next
+            self._next += 1
+        return f"ORD-{today.strftime('%Y%m%d')}-{value:0{SUFFIX_LENGTH}d}"
+
+
+_generators = {}
+
+
+def get_generator():
+    """Instance of settings.ORDER_NUMBER_GENERATOR, created once per process."""
+    path = getattr(settings, 'ORDER_NUMBER_GENERATOR', 'crm_core.order_numbers.TimeOrderedGenerator')
+    generator = _generators.get(path)
+    if generator is None:
+        generator = _generators.setdefault(path, import_string(path)())
+    return generator
+
+
+def reset_generators():
+    """Drops the per-process generators, e.g. in a freshly forked worker whose settings changed."""
+    _generators.clear()
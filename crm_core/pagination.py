@@ -0,0 +1,143 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor keyset pagination.
+
+    Rows are ordered by `ordering` (unique as a whole) and each page is fetched with a
+    `WHERE (ordering) > (last row)` filter instead of OFFSET, so page N costs the same as page 1.
+    The cursor is base64 encoded JSON holding the boundary row's ordering values and the direction.
+    """
+    ordering = ('id',)
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Links point at the request URL unless set (pages embedded in another endpoint's response)
+    base_url = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        position, reverse = self.decode_cursor(request)
+
+        order_by = [self.flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.next_position = self.position_of(results[-1]) if results and self.has_next else None
+        self.previous_position = self.position_of(results[0]) if results and self.has_previous else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def keyset_filter(self, position, reverse):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        clauses = []
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = {self.ordering[j].lstrip('-'): position[j] for j in range(i)}
+            lookup[f"{field.lstrip('-')}__{'lt' if descending else 'gt'}"] = position[i]
+            clauses.append(Q(**lookup))
+        return reduce(or_, clauses)
+
+    def position_of(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def cursor_token(self, position, reverse=False):
+        # Non-integer values go through their string form; decode_cursor parses them back with to_python
+        payload = {'p': [
+            v if isinstance(v, int) else (v.isoformat() if hasattr(v, 'isoformat') else str(v))
+            for v in position
+        ]}
+        if reverse:
+            payload['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def encode_cursor(self, position, reverse):
+        cursor = self.cursor_token(position, reverse)
+        return replace_query_param(self.base_url or self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OrderKeysetPagination(KeysetPagination):
+    # Newest orders first
+    ordering = ('-created_at', '-id')
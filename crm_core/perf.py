@@ -0,0 +1,140 @@
+import contextvars
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Metrics of the request being handled, set by middleware.PerformanceMiddleware
+current_metrics = contextvars.ContextVar('crm_core_perf_metrics', default=None)
+
+METRICS = ('wall_ms', 'db_ms', 'queries', 'serializer_ms', 'bytes')
+
+
+class RequestMetrics:
+    """
+    Counters for one request. Doubles as a database execute wrapper, so every query run while
+    it is installed adds to the query count and DB time (and to the SQL shape counts when
+    N+1 detection is on).
+    """
+    def __init__(self, track_shapes=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.shapes = Counter() if track_shapes else None
+        self._timing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            if self.shapes is not None:
+                # Parameters are passed separately, so the SQL text is already the query's shape
+                self.shapes[sql] += 1
+
+    def repeated_shapes(self, threshold):
+        if self.shapes is None:
+            return []
+        return [(sql, count) for sql, count in self.shapes.most_common() if count >= threshold]
+
+
+@contextmanager
+def timed_serialization():
+    """Adds the time spent in the block to the current request's serializer time (outermost block only)."""
+    metrics = current_metrics.get()
+    if metrics is None or metrics._timing:
+        yield
+        return
+    metrics._timing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics._timing = False
+
+
+class Histogram:
+    """
+    Log-bucketed histogram: each bucket is ~19% wider than the previous one, so percentiles are
+    accurate to within that and memory stays bounded however many values are added.
+    """
+    GROWTH = 2 ** 0.25
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        bucket = math.ceil(math.log(value, self.GROWTH)) if value > 0 else None
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, capped at the largest value seen."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 0.0 if bucket is None else min(self.GROWTH ** bucket, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'p50': _round(self.percentile(50)),
+            'p95': _round(self.percentile(95)),
+            'p99': _round(self.percentile(99)),
+            'max': _round(self.max),
+            'mean': _round(self.total / self.count) if self.count else None,
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+class PerfRegistry:
+    """In-process histograms per view name; each worker process keeps its own."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, values, n_plus_one=False):
+        with self._lock:
+            view = self._views.get(view_name)
+            if view is None:
+                view = self._views[view_name] = {
+                    'requests': 0, 'n_plus_one': 0, 'histograms': {name: Histogram() for name in METRICS},
+                }
+            view['requests'] += 1
+            view['n_plus_one'] += int(n_plus_one)
+            for name, value in values.items():
+                view['histograms'][name].add(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {
+                    'requests': view['requests'],
+                    'n_plus_one': view['n_plus_one'],
+                    **{name: histogram.summary() for name, histogram in view['histograms'].items()},
+                }
+                for view_name, view in sorted(self._views.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+
+perf_registry = PerfRegistry()
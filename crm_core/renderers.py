@@ -0,0 +1,61 @@
+"""
+Response encodings negotiated from the Accept header (see REST_FRAMEWORK in settings.py):
+
+- FastJSONRenderer: the default JSON output, encoded with orjson when it is installed. Values
+  orjson does not handle natively (Decimal, datetimes, lazy strings) go through DRF's encoder,
+  so the document is the same as JSONRenderer's.
+- MessagePackRenderer / MessagePackParser: application/msgpack bodies (pip install msgpack),
+  with the same values as the JSON document.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - MessagePack is only offered when installed
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+# DRF's conversions for values outside the JSON/MessagePack types
+encode_default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented output (?format=json with indent=, the browsable API) stays on the stdlib path
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data, default=encode_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = MSGPACK_MEDIA_TYPE
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
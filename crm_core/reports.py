@@ -0,0 +1,89 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Concat, TruncDate, TruncMonth, TruncWeek
+from rest_framework.exceptions import ValidationError
+
+from .exports import filter_orders
+from .models import Order, OrderItem
+
+REPORT_CACHE_TIMEOUT = 300
+TOP_DEFAULT_LIMIT = 10
+TOP_MAX_LIMIT = 100
+
+# group_by -> (key expression, label expression) over OrderItem
+GROUPINGS = {
+    'day': (TruncDate('order__created_at'), None),
+    'week': (TruncWeek('order__created_at'), None),
+    'month': (TruncMonth('order__created_at'), None),
+    'product': (F('product_id'), F('product__name')),
+    'size_name': (F('size_name'), None),
+    'organization': (F('order__contact__organization_id'), F('order__contact__organization__name')),
+}
+TOP = {
+    'products': (F('product_id'), F('product__name')),
+    'contacts': (F('order__contact_id'), Concat('order__contact__first_name', Value(' '), 'order__contact__last_name')),
+}
+METRICS = ('revenue', 'quantity')
+
+
+def aggregate(params, key, label, order_by, limit=None):
+    """
+    One GROUP BY over the (date filtered) order lines; returns plain dicts.
+    """
+    items = filter_orders(OrderItem.objects.all(), params, field='order__created_at')
+    values = {'key': key}
+    if label is not None:
+        values['label'] = label
+    rows = items.values(**values).annotate(
+        orders=Count('order', distinct=True), quantity=Sum('qty'), revenue=Sum('line_total'),
+    ).order_by(*order_by)
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        {**row, 'key': row['key'].isoformat() if hasattr(row['key'], 'isoformat') else row['key'],
+         'revenue': float(row['revenue'])}
+        for row in rows
+    ]
+
+
+def build_report(params):
+    """
+    ?group_by=day|week|month|product|size_name|organization, or
+    ?top=products|contacts&metric=revenue|quantity&limit=N; both accept date_from / date_to.
+    """
+    if params.get('top'):
+        top = params['top']
+        metric = params.get('metric', 'revenue')
+        if top not in TOP or metric not in METRICS:
+            raise ValidationError({'error': f"top must be one of {sorted(TOP)} and metric one of {list(METRICS)}"})
+        try:
+            limit = min(max(int(params.get('limit', TOP_DEFAULT_LIMIT)), 1), TOP_MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({'error': 'limit must be an integer'})
+        key, label = TOP[top]
+        rows = aggregate(params, key, label, [f'-{metric}', 'key'], limit)
+        return {'top': top, 'metric': metric, 'rows': rows}
+
+    group_by = params.get('group_by', 'day')
+    if group_by not in GROUPINGS:
+        raise ValidationError({'error': f"group_by must be one of {sorted(GROUPINGS)}"})
+    key, label = GROUPINGS[group_by]
+    return {'group_by': group_by, 'rows': aggregate(params, key, label, ['key'])}
+
+
+def cached_report(params):
+    """
+    Reports are cached per filter set; any new order changes the key, so only deletions and
+    edits can be served stale, for at most REPORT_CACHE_TIMEOUT seconds.
+    """
+    latest_order_id = Order.objects.aggregate(latest=Max('id'))['latest']
+    names = ('group_by', 'top', 'metric', 'limit', 'date_from', 'date_to')
+    fingerprint = '&'.join(f'{name}={params.get(name, "")}' for name in names)
+    cache_key = 'crm_core:report:%s:%s' % (latest_order_id, hashlib.md5(fingerprint.encode()).hexdigest())
+    report = cache.get(cache_key)
+    if report is None:
+        report = build_report(params)
+        cache.set(cache_key, report, REPORT_CACHE_TIMEOUT)
+    return report
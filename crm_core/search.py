@@ -0,0 +1,168 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Contact, Organization, Product, SearchEntry
+
+FTS_TABLE = 'crm_core_searchentry_fts'
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+MAX_TERMS = 8
+TERM_RE = re.compile(r'\w+')
+
+# ?type= value -> SearchEntry.kind
+SEARCH_TYPES = {
+    'contacts': 'contact',
+    'organizations': 'organization',
+    'products': 'product',
+}
+
+
+def contact_document(contact):
+    phone_digits = ''.join(c for c in contact.phone if c.isdigit())
+    org_name = contact.organization.name
+    return (
+        f"{contact.first_name} {contact.last_name}",
+        f"{contact.email} · {org_name}",
+        # Digits only too, so "5551234" finds "555-1234"
+        f"{contact.email} {contact.phone} {phone_digits} {org_name}",
+    )
+
+
+def organization_document(org):
+    return org.name, org.address or '', f"{org.address or ''} {org.gst_no or ''}"
+
+
+def product_document(product):
+    return product.name, product.sku, product.sku
+
+
+# kind -> (queryset the document is built from, (title, subtitle, body) builder)
+DOCUMENTS = {
+    'contact': (lambda: Contact.objects.select_related('organization'), contact_document),
+    'organization': (lambda: Organization.objects.all(), organization_document),
+    'product': (lambda: Product.objects.all(), product_document),
+}
+
+
+def index_objects(kind, instances):
+    """Upserts the search documents of the given instances in one statement."""
+    build = DOCUMENTS[kind][1]
+    entries = []
+    for instance in instances:
+        title, subtitle, body = build(instance)
+        entries.append(SearchEntry(kind=kind, object_id=instance.pk, title=title[:255], subtitle=subtitle[:255], body=body))
+    SearchEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'subtitle', 'body'],
+    )
+
+
+def unindex(kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def reindex(kind, queryset=None, chunk_size=2000):
+    """
+    Rebuilds the documents of `kind` (all rows, or only `queryset`) in chunks.
+    A full rebuild also drops documents whose row no longer exists.
+    """
+    full = queryset is None
+    if full:
+        queryset = DOCUMENTS[kind][0]()
+    chunk = []
+    for instance in queryset.order_by('pk').iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            index_objects(kind, chunk)
+            chunk = []
+    if chunk:
+        index_objects(kind, chunk)
+    if full:
+        SearchEntry.objects.filter(kind=kind).exclude(object_id__in=queryset.model.objects.values('pk')).delete()
+
+
+_fts_available = None
+
+
+def fts_available():
+    # The FTS5 table is only created when SQLite was built with FTS5 (see migration 0005)
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def search_terms(query):
+    return [term.lower() for term in TERM_RE.findall(query or '')][:MAX_TERMS]
+
+
+def search_sqlite(terms, kinds, limit):
+    # Every term is a prefix query; terms are ANDed. bm25 weighs title matches 10x the body.
+    match = ' '.join(f'"{term}"*' for term in terms)
+    placeholders = ', '.join(['%s'] * len(kinds))
+    sql = f"""
+        SELECT e.kind, e.object_id, e.title, e.subtitle, -bm25({FTS_TABLE}, 10.0, 1.0) AS score
+        FROM {FTS_TABLE} JOIN crm_core_searchentry e ON e.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s AND e.kind IN ({placeholders})
+        ORDER BY score DESC, e.id LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *kinds, limit])
+        return cursor.fetchall()
+
+
+def search_postgresql(terms, kinds, limit):
+    # Expression must match the GIN index from migration 0005. Trigram similarity on the title
+    # catches misspelled names the prefix query misses.
+    sql = """
+        SELECT kind, object_id, title, subtitle,
+               ts_rank(to_tsvector('simple', title || ' ' || body), query) + similarity(title, %(raw)s) AS score
+        FROM crm_core_searchentry, to_tsquery('simple', %(tsquery)s) query
+        WHERE kind = ANY(%(kinds)s)
+          AND (to_tsvector('simple', title || ' ' || body) @@ query OR title %% %(raw)s)
+        ORDER BY score DESC, id LIMIT %(limit)s
+    """
+    params = {
+        'raw': ' '.join(terms),
+        'tsquery': ' & '.join(f'{term}:*' for term in terms),
+        'kinds': list(kinds),
+        'limit': limit,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_fallback(terms, kinds, limit):
+    # No full-text index for this database: unranked substring match, titles starting with the first term first
+    entries = SearchEntry.objects.filter(kind__in=kinds)
+    for term in terms:
+        entries = entries.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    rows = entries.values_list('kind', 'object_id', 'title', 'subtitle').order_by('title', 'id')[:limit]
+    rows = [(*row, 1.0 if row[2].lower().startswith(terms[0]) else 0.0) for row in rows]
+    return sorted(rows, key=lambda row: -row[4])
+
+
+def search(query, kinds=None, limit=SEARCH_DEFAULT_LIMIT):
+    """
+    Ranked prefix search over contacts, organizations and products, best match first.
+    Returns [{'type', 'id', 'title', 'subtitle', 'rank'}]; an empty query matches nothing.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    kinds = list(kinds or SEARCH_TYPES.values())
+    if connection.vendor == 'postgresql':
+        rows = search_postgresql(terms, kinds, limit)
+    elif connection.vendor == 'sqlite' and fts_available():
+        rows = search_sqlite(terms, kinds, limit)
+    else:
+        rows = search_fallback(terms, kinds, limit)
+    return [
+        {'type': kind, 'id': object_id, 'title': title, 'subtitle': subtitle, 'rank': round(score, 4)}
+        for kind, object_id, title, subtitle, score in rows
+    ]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Organization, Contact, Product, SizePrice, Order, OrderItem, User
+from .perf import timed_serialization
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,6 +23,7 @@ class SizePriceSerializer(serializers.ModelSerializer):
     class Meta:
         model = SizePrice
         fields = '__all__'
+        read_only_fields = ('product',) # set from the URL by SizePriceCreateView
 
 class ProductSerializer(serializers.ModelSerializer):
     sizes = SizePriceSerializer(many=True, read_only=True)
@@ -44,3 +46,144 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = '__all__'
+
+
+# Read-optimized serializers for hot GET paths.
+# They build the same output as the ModelSerializers above directly from the instance,
+# skipping per-field DRF machinery. Views must select/prefetch the related rows they read.
+
+_decimal = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+# Order.total has two more digits than prices and line totals
+_total = serializers.DecimalField(max_digits=12, decimal_places=2).to_representation
+_datetime = serializers.DateTimeField().to_representation
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+class ReadSerializer(serializers.BaseSerializer):
+    """
+    Base of the read serializers: time spent building .data is reported by the perf middleware.
+    """
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+class OrganizationReadSerializer(ReadSerializer):
+    def to_representation(self, org):
+        return {
+            'id': org.id,
+            'name': org.name,
+            'address': org.address,
+            'gst_no': org.gst_no,
+            'updated_at': _datetime(org.updated_at),
+        }
+
+class ContactReadSerializer(ReadSerializer):
+    def to_representation(self, contact):
+        return {
+            'id': contact.id,
+            'organization_name': contact.organization.name,
+            'first_name': contact.first_name,
+            'last_name': contact.last_name,
+            'email': contact.email,
+            'phone': contact.phone,
+            'updated_at': _datetime(contact.updated_at),
+            'organization': contact.organization_id,
+        }
+
+class ProductReadSerializer(ReadSerializer):
+    def to_representation(self, product):
+        return {
+            'id': product.id,
+            'sizes': [
+                {
+                    'id': size.id, 'size_name': size.size_name, 'price': _decimal(size.price),
+                    'updated_at': _datetime(size.updated_at), 'product': size.product_id,
+                }
+                for size in product.sizes.all()
+            ],
+            'name': product.name,
+            'sku': product.sku,
+            'base_price': _decimal(product.base_price),
+            'offer_percent': _decimal(product.offer_percent),
+            'updated_at': _datetime(product.updated_at),
+        }
+
+class OrderReadSerializer(ReadSerializer):
+    def to_representation(self, order):
+        return {
+            'id': order.id,
+            'items': [
+                {
+                    'id': item.id,
+                    'product_name': item.product.name,
+                    'size_name': item.size_name,
+                    'qty': item.qty,
+                    'unit_price': _decimal(item.unit_price),
+                    'line_total': _decimal(item.line_total),
+                    'extras': item.extras,
+                    'customization': item.customization,
+                    'updated_at': _datetime(item.updated_at),
+                    'order': item.order_id,
+                    'product': item.product_id,
+                }
+                for item in order.items.all()
+            ],
+            'contact_name': order.contact.first_name,
+            'order_no': order.order_no,
+            'created_at': _datetime(order.created_at),
+            'total': _total(order.total),
+            'line_count': order.line_count,
+            'updated_at': _datetime(order.updated_at),
+            'contact': order.contact_id,
+        }
+
+
+# Row serializers for bulk import. They only validate field shapes (no DB lookups);
+# organizations are resolved and uniqueness is enforced in bulk by imports.py.
+
+class OrganizationImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    address = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    gst_no = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True)
+
+class ContactImportSerializer(serializers.Serializer):
+    first_name = serializers.CharField(max_length=100)
+    last_name = serializers.CharField(max_length=100)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20)
+    organization = serializers.CharField(max_length=255, help_text='Organization name')
+
+class SizePriceImportSerializer(serializers.Serializer):
+    size_name = serializers.CharField(max_length=50)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class SizesField(serializers.Field):
+    """
+    Accepts a list of {"size_name", "price"} objects, or "S=10.00;M=12.50" in CSV files.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [
+                dict(zip(('size_name', 'price'), part.split('=', 1)))
+                for part in data.split(';') if part.strip()
+            ]
+        if not isinstance(data, list):
+            raise serializers.ValidationError('Expected a list of sizes.')
+        serializer = SizePriceImportSerializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+class ProductImportSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    sku = serializers.CharField(max_length=100)
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    offer_percent = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, default=0)
+    sizes = SizesField(required=False)
@@ -0,0 +1,151 @@
+from django.contrib.auth.hashers import check_password
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Organization, Contact, Product, SizePrice, Order, OrderItem, User
+from . import search
+from .authentication import principal_cache
+from .catalog import price_catalog
+from .http_cache import invalidate_model
+from .stats import COUNTED_MODELS, REVENUE, add_deltas, folded_rollup_keys, refresh_rollup_keys
+from .sync import DEPENDENTS, PARENTS, record_deletions, touch_dependents, touch_parent
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=SizePrice)
+def invalidate_price_catalog(sender, **kwargs):
+    price_catalog.invalidate()
+
+COUNTER_NAMES = {model: name for name, model in COUNTED_MODELS.items()}
+
+def counter_deltas(instance, sign):
+    deltas = {COUNTER_NAMES[type(instance)]: sign}
+    if isinstance(instance, Order) and instance.total:
+        deltas[REVENUE] = sign * instance.total
+    return deltas
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        add_deltas(counter_deltas(instance, 1))
+
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+def count_deleted(sender, instance, **kwargs):
+    add_deltas(counter_deltas(instance, -1))
+
+def deleted_with_order(origin):
+    # Lines only outlive a delete of themselves or of their product; otherwise their order goes too
+    return getattr(origin, 'model', type(origin)) not in (OrderItem, Product)
+
+@receiver(pre_delete, sender=Order)
+@receiver([pre_save, pre_delete], sender=OrderItem)
+def collect_rollup_keys(sender, instance, raw=False, origin=None, **kwargs):
+    # Rollups the row counts in before the change; refreshed once it is done
+    instance._rollup_keys = set()
+    if raw or instance.pk is None or (sender is OrderItem and origin is not None and deleted_with_order(origin)):
+        return
+    lookup = {'order_id': instance.pk} if sender is Order else {'pk': instance.pk}
+    instance._rollup_keys = folded_rollup_keys(OrderItem.objects.filter(**lookup))
+
+@receiver(post_delete, sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_changed_rollups(sender, instance, raw=False, **kwargs):
+    keys = getattr(instance, '_rollup_keys', set())
+    if sender is OrderItem and 'created' in kwargs and not raw:
+        keys = keys | folded_rollup_keys(OrderItem.objects.filter(pk=instance.pk))
+    if keys:
+        refresh_rollup_keys(keys)
+
+SEARCH_KINDS = {Organization: 'organization', Contact: 'contact', Product: 'product'}
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Product)
+def update_search_entry(sender, instance, created, **kwargs):
+    search.index_objects(SEARCH_KINDS[sender], [instance])
+    if sender is Organization and not created and getattr(instance, '_dependents_changed', False):
+        # Contact documents include the organization name
+        search.reindex('contact', Contact.objects.select_related('organization').filter(organization=instance))
+
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Product)
+def delete_search_entry(sender, instance, **kwargs):
+    search.unindex(SEARCH_KINDS[sender], [instance.pk])
+
+@receiver([post_save, post_delete], sender=Organization)
+@receiver([post_save, post_delete], sender=Contact)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=SizePrice)
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_http_cache(sender, **kwargs):
+    invalidate_model(sender)
+
+@receiver(pre_save, sender=Organization)
+@receiver(pre_save, sender=Contact)
+@receiver(pre_save, sender=Product)
+def check_shown_fields(sender, instance, raw=False, **kwargs):
+    # Whether rows of other resources showing this one (contacts their organization's name...) change too
+    instance._dependents_changed = False
+    if raw or instance.pk is None:
+        return
+    fields = DEPENDENTS[sender][0]
+    old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._dependents_changed = bool(old) and any(old[field] != getattr(instance, field) for field in fields)
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Product)
+def touch_dependent_rows(sender, instance, **kwargs):
+    if getattr(instance, '_dependents_changed', False):
+        touch_dependents(sender, [instance.pk])
+
+@receiver([post_save, post_delete], sender=SizePrice)
+@receiver([post_save, post_delete], sender=OrderItem)
+def touch_parent_row(sender, instance, origin=None, **kwargs):
+    # Rows deleted along with their product or order: the parent leaves a tombstone instead
+    if isinstance(origin, PARENTS[sender][0]) or getattr(origin, 'model', None) is PARENTS[sender][0]:
+        return
+    touch_parent(instance)
+
+@receiver(post_delete, sender=Organization)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+def record_tombstone(sender, instance, **kwargs):
+    record_deletions(sender, [instance.pk])
+
+TOKEN_FIELDS = ('password', 'role', 'is_active')
+
+def same_password(instance, old_hash):
+    # set_password() keeps the raw password in _password, User.check_password() in _checked_password
+    raw_password = instance._password or getattr(instance, '_checked_password', None)
+    return raw_password is not None and check_password(raw_password, old_hash)
+
+@receiver(pre_save, sender=User)
+def bump_token_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    fields = [field for field in TOKEN_FIELDS if update_fields is None or field in update_fields]
+    if not fields:
+        return
+    old = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if not old:
+        return
+    changed = {field for field in fields if old[field] != getattr(instance, field)}
+    if 'password' in changed and same_password(instance, old['password']):
+        changed.discard('password')
+    if changed:
+        instance.token_version += 1
+        if update_fields is not None and 'token_version' not in update_fields:
+            # A partial save only writes its update_fields
+            User.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_principal(sender, instance, **kwargs):
+    principal_cache.invalidate(instance.pk)
@@ -0,0 +1,170 @@
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Contact, Order, OrderItem, Organization, Product, RevenueRollup, StatCounter
+
+# Counter name -> model whose rows it counts
+COUNTED_MODELS = {
+    'total_organizations': Organization,
+    'total_contacts': Contact,
+    'total_products': Product,
+    'total_orders': Order,
+}
+REVENUE = 'total_revenue'
+WATERMARK = 'rollup_order_id'
+
+# Orders younger than this are left for the next compaction so a transaction that took
+# a lower id but committed late is not skipped by the watermark
+ROLLUP_SETTLE_TIME = datetime.timedelta(seconds=60)
+
+# RevenueRollup dimension -> (OrderItem expression grouped on, OrderItem lookup of one key)
+ROLLUP_GROUPS = {
+    'day': (TruncDate('order__created_at'), 'order__created_at__date'),
+    'product': (F('product_id'), 'product_id'),
+    'organization': (F('order__contact__organization_id'), 'order__contact__organization_id'),
+}
+
+
+def add_deltas(deltas):
+    """Appends counter deltas ({name: value}) in one INSERT."""
+    StatCounter.objects.bulk_create([StatCounter(name=name, value=value) for name, value in deltas.items()])
+
+
+def read_counters():
+    """Current value of every counter: one GROUP BY over the compacted rows plus recent deltas."""
+    return dict(StatCounter.objects.values_list('name').annotate(total=Sum('value')))
+
+
+def dashboard_stats():
+    counters = read_counters()
+    stats = {name: int(counters.get(name, 0)) for name in COUNTED_MODELS}
+    stats[REVENUE] = float(counters.get(REVENUE, 0))
+    return stats
+
+
+def recount(*names):
+    """
+    Resets counters to an exact COUNT(*) / SUM; used after writes that skip signals and by
+    compact_stats --recount.
+    """
+    names = names or (*COUNTED_MODELS, REVENUE)
+    with transaction.atomic():
+        current = read_counters()
+        exact = {}
+        for name in names:
+            if name == REVENUE:
+                exact[name] = Order.objects.aggregate(total=Sum('total'))['total'] or Decimal(0)
+            else:
+                exact[name] = COUNTED_MODELS[name].objects.count()
+        add_deltas({
+            name: value - current.get(name, 0)
+            for name, value in exact.items() if value != current.get(name, 0)
+        })
+
+
+def compact_counters():
+    """Replaces each counter's delta rows with a single row holding their sum."""
+    with transaction.atomic():
+        # Work on the rows read here only, so deltas committed meanwhile are left for next time
+        rows = list(StatCounter.objects.exclude(name=WATERMARK).values_list('id', 'name', 'value'))
+        totals = {}
+        for _, name, value in rows:
+            totals[name] = totals.get(name, 0) + value
+        ids = [row[0] for row in rows]
+        for start in range(0, len(ids), 500):
+            StatCounter.objects.filter(id__in=ids[start:start + 500]).delete()
+        add_deltas(totals)
+
+
+def compact_rollups():
+    """
+    Folds orders created since the last run into RevenueRollup, one GROUP BY per dimension.
+    Returns the number of orders folded in.
+    """
+    with transaction.atomic():
+        watermark_row = StatCounter.objects.select_for_update().filter(name=WATERMARK).first()
+        watermark = int(watermark_row.value) if watermark_row else 0
+        orders = Order.objects.filter(id__gt=watermark, created_at__lt=timezone.now() - ROLLUP_SETTLE_TIME)
+        new_watermark = orders.aggregate(last_id=Max('id'))['last_id']
+        if new_watermark is None:
+            return 0
+        order_count = Order.objects.filter(id__gt=watermark, id__lte=new_watermark).count()
+
+        items = OrderItem.objects.filter(order_id__gt=watermark, order_id__lte=new_watermark)
+        for dimension, (expression, _) in ROLLUP_GROUPS.items():
+            rows = items.values(group=expression).annotate(
+                orders=Count('order', distinct=True), quantity=Sum('qty'), revenue=Sum('line_total'),
+            )
+            apply_rollup(dimension, {str(row['group']): row for row in rows})
+
+        if watermark_row is None:
+            StatCounter.objects.create(name=WATERMARK, value=new_watermark)
+        else:
+            watermark_row.value = new_watermark
+            watermark_row.save(update_fields=['value'])
+    return order_count
+
+
+def apply_rollup(dimension, rows):
+    existing = {
+        rollup.key: rollup
+        for rollup in RevenueRollup.objects.filter(dimension=dimension, key__in=rows)
+    }
+    to_create = []
+    for key, row in rows.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            to_create.append(RevenueRollup(
+                dimension=dimension, key=key,
+                orders=row['orders'], quantity=row['quantity'], revenue=row['revenue'],
+            ))
+        else:
+            rollup.orders += row['orders']
+            rollup.quantity += row['quantity']
+            rollup.revenue += row['revenue']
+    RevenueRollup.objects.bulk_create(to_create)
+    RevenueRollup.objects.bulk_update(existing.values(), ['orders', 'quantity', 'revenue'])
+
+
+def rollup_watermark(lock=False):
+    """Id of the last order compact_rollups folded in (0 before the first run)."""
+    rows = StatCounter.objects.filter(name=WATERMARK)
+    if lock:
+        rows = rows.select_for_update()
+    row = rows.first()
+    return int(row.value) if row else 0
+
+
+def folded_rollup_keys(items):
+    """(dimension, key) of the rollups the given OrderItem rows count in, if already folded in."""
+    watermark = rollup_watermark()
+    if not watermark:
+        return set()
+    rows = items.filter(order_id__lte=watermark).annotate(**{
+        f'rollup_{dimension}': expression for dimension, (expression, _) in ROLLUP_GROUPS.items()
+    }).values_list(*(f'rollup_{dimension}' for dimension in ROLLUP_GROUPS)).distinct()
+    return {(dimension, str(key)) for row in rows for dimension, key in zip(ROLLUP_GROUPS, row)}
+
+
+def refresh_rollup_keys(keys):
+    """
+    Recomputes the given rollups from the orders already folded in, after a delete or an order line
+    change that compact_rollups, which only adds new orders, would never see. Idempotent.
+    """
+    with transaction.atomic():
+        # Locked so compact_rollups cannot fold more orders in meanwhile
+        watermark = rollup_watermark(lock=True)
+        for dimension, key in keys:
+            lookup = ROLLUP_GROUPS[dimension][1]
+            row = OrderItem.objects.filter(order_id__lte=watermark, **{lookup: key}).aggregate(
+                orders=Count('order', distinct=True), quantity=Sum('qty'), revenue=Sum('line_total'),
+            )
+            if not row['orders']:
+                RevenueRollup.objects.filter(dimension=dimension, key=key).delete()
+            else:
+                RevenueRollup.objects.update_or_create(dimension=dimension, key=key, defaults=row)
@@ -0,0 +1,139 @@
+"""
+Small database-backed task queue.
+
+Code enqueues work with enqueue(name, payload); the row is written once the surrounding
+transaction commits, so a rolled back order never queues anything and workers never see
+uncommitted rows. `manage.py worker` claims due tasks in batches and runs them in a thread or
+process pool; failures are retried with exponential backoff up to the task's max_attempts.
+"""
+import datetime
+import os
+import random
+import socket
+import traceback
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .stats import ROLLUP_SETTLE_TIME, compact_rollups
+
+# name -> (function, max_attempts)
+REGISTRY = {}
+
+
+def task(name, max_attempts=None):
+    """Registers fn(**payload) as a task under `name`."""
+    def register(fn):
+        REGISTRY[name] = (fn, max_attempts or getattr(settings, 'TASK_MAX_ATTEMPTS', 5))
+        return fn
+    return register
+
+
+def enqueue(name, payload=None, delay=None):
+    """Queues a task once the current transaction commits (right away outside one)."""
+    if name not in REGISTRY:
+        raise KeyError(f"Unknown task: {name}")
+    run_at = timezone.now() + (delay or datetime.timedelta(0))
+    transaction.on_commit(lambda: Task.objects.create(name=name, payload=payload or {}, run_at=run_at))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped, +-20%."""
+    base = getattr(settings, 'TASK_RETRY_BASE_DELAY', 5)
+    cap = getattr(settings, 'TASK_RETRY_MAX_DELAY', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return datetime.timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_batch(batch_size, locked_by):
+    """
+    Marks up to batch_size due tasks as running and returns them. Tasks left running longer than
+    TASK_VISIBILITY_TIMEOUT (their worker died) are due again. SKIP LOCKED lets several workers
+    claim side by side on PostgreSQL; SQLite serializes the claim transactions instead.
+    """
+    now = timezone.now()
+    stale = now - datetime.timedelta(seconds=getattr(settings, 'TASK_VISIBILITY_TIMEOUT', 300))
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', run_at__lte=now) | Q(status='running', locked_at__lt=stale))
+            .order_by('run_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids).update(
+            status='running', locked_by=locked_by, locked_at=now, attempts=F('attempts') + 1,
+        )
+        return list(Task.objects.filter(id__in=ids).order_by('run_at'))
+
+
+def run_task(name, payload):
+    """Runs one task in the current thread or pool process; exceptions propagate to the worker."""
+    # Pool threads and processes keep their own connections; drop broken or expired ones
+    close_old_connections()
+    try:
+        fn, _ = REGISTRY[name]
+        fn(**payload)
+    finally:
+        close_old_connections()
+
+
+def finish(done, failed):
+    """
+    Records a batch's outcome: finished tasks are deleted in one statement, failed ones are
+    rescheduled with backoff or marked failed once they run out of attempts.
+    """
+    if done:
+        Task.objects.filter(id__in=[t.id for t in done]).delete()
+    for t, error in failed:
+        max_attempts = REGISTRY[t.name][1] if t.name in REGISTRY else t.attempts
+        if t.attempts < max_attempts:
+            Task.objects.filter(id=t.id).update(
+                status='pending', run_at=timezone.now() + retry_delay(t.attempts), last_error=error, locked_by='',
+            )
+        else:
+            Task.objects.filter(id=t.id).update(status='failed', last_error=error)
+
+
+def run_batch(executor, tasks):
+    """Runs claimed tasks on the executor, waits for all of them and records the results."""
+    futures = []
+    done, failed = [], []
+    for t in tasks:
+        if t.name not in REGISTRY:
+            failed.append((t, f"Unknown task: {t.name}"))
+            continue
+        futures.append((t, executor.submit(run_task, t.name, t.payload)))
+    for t, future in futures:
+        try:
+            future.result()
+            done.append(t)
+        except Exception as e:
+            failed.append((t, ''.join(traceback.format_exception_only(type(e), e)).strip()))
+    finish(done, failed)
+    return len(done), len(failed)
+
+
+# Tasks
+
+@task('refresh_rollups')
+def refresh_rollups():
+    compact_rollups()
+
+
+def schedule_rollup_refresh():
+    """
+    Called after each order: folds new orders into the revenue rollups once they have settled,
+    instead of waiting for the next compact_stats run. At most one refresh is queued per
+    settle period (per process with the local-memory cache).
+    """
+    if cache.add('crm_core:tasks:refresh_rollups', 1, timeout=ROLLUP_SETTLE_TIME.total_seconds()):
+        enqueue('refresh_rollups', delay=ROLLUP_SETTLE_TIME + datetime.timedelta(seconds=1))
@@ -1,7 +1,20 @@
+from django.core.cache import cache
 from django.test import TestCase
-from .models import Organization, Contact, Product, SizePrice, Order, OrderItem
+from rest_framework.test import APIClient
+from .models import Organization, Contact, Product, SizePrice, Order, OrderItem, User
 from .logic import generate_order_number, calculate_item_price, apply_offer, get_normalized_items
 from decimal import Decimal
+import datetime
+
+class AuthenticatedTestCase(TestCase):
+    """API tests: self.client is authenticated as self.user, and the shared cache starts empty."""
+    role = 'manager'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u1", password="pw", role=self.role)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
 
 class ModelLogicTest(TestCase):
     def test_order_number_generation(self):
@@ -9,6 +22,36 @@ class ModelLogicTest(TestCase):
         self.assertTrue(order_no.startswith('ORD-'))
         self.assertEqual(len(order_no), 21) # ORD-YYYYMMDD-XXXXXXXX
 
+    def test_time_ordered_numbers_sort_and_never_repeat(self):
+        from .order_numbers import TimeOrderedGenerator
+        generator = TimeOrderedGenerator(worker_id=5)
+        numbers = [generator() for _ in range(5000)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(len(n) == 21 for n in numbers))
+        # Another worker in the same millisecond gets a different number
+        other = TimeOrderedGenerator(worker_id=6)
+        other.now = generator.now = lambda: datetime.datetime(2025, 6, 12, 10, 0, 0, 123000)
+        self.assertNotEqual(generator(), other())
+
+    def test_time_ordered_numbers_survive_clock_step_back(self):
+        from .order_numbers import TimeOrderedGenerator
+        generator = TimeOrderedGenerator(worker_id=1)
+        generator.now = lambda: datetime.datetime(2025, 6, 12, 10, 0, 1)
+        first = generator()
+        generator.now = lambda: datetime.datetime(2025, 6, 12, 10, 0, 0)
+        self.assertGreater(generator(), first)
+
+    def test_sequence_numbers_use_blocks(self):
+        from .order_numbers import SequenceGenerator
+        generator = SequenceGenerator(block_size=10)
+        numbers = [generator() for _ in range(10)]
+        self.assertEqual([int(n[-8:]) for n in numbers], list(range(1, 11)))
+        other_process = SequenceGenerator(block_size=10)
+        with self.assertNumQueries(4): # one block: savepoint, select for update, update, release
+            self.assertEqual([int(other_process()[-8:]) for _ in range(10)], list(range(11, 21)))
+        self.assertEqual(int(generator()[-8:]), 21)
+
     def test_price_calculation_fallback(self):
         product = Product.objects.create(name="Test Prod", sku="TP1", base_price=Decimal('100.00'))
         SizePrice.objects.create(product=product, size_name="M", price=Decimal('120.00'))
@@ -44,6 +87,26 @@ class CartMergeTest(TestCase):
         self.assertEqual(merged[0]['qty'], 3)
         self.assertEqual(merged[0]['product_id'], 1)
 
+    def test_merge_normalizes_nested_extras(self):
+        items = [
+            {'product_id': 1, 'size_name': 'M', 'qty': 1, 'extras': {'a': [2, 'x', 1], 'b': {'c': None, 'd': True}}},
+            {'product_id': 1, 'size_name': 'M', 'qty': 2, 'extras': {'b': {'d': True, 'c': None}, 'a': [1, 2, 'x']}}, # Same extras, other order
+            {'product_id': 1, 'size_name': 'M', 'qty': 1, 'extras': {'a': [1, 2, '1'], 'b': {'c': None, 'd': True}}}, # "1" != 1
+            {'product_id': 1, 'size_name': 'M', 'qty': 1}, # No extras
+        ]
+        merged = get_normalized_items(items)
+        self.assertEqual([m['qty'] for m in merged], [3, 1, 1])
+
+    def test_merge_does_not_mutate_input(self):
+        items = [
+            {'product_id': 1, 'size_name': 'M', 'qty': 1, 'extras': ['b', 'a']},
+            {'product_id': 1, 'size_name': 'M', 'qty': 2, 'extras': ['a', 'b']},
+        ]
+        merged = get_normalized_items(items)
+        self.assertEqual(merged[0]['qty'], 3)
+        self.assertEqual(items[0], {'product_id': 1, 'size_name': 'M', 'qty': 1, 'extras': ['b', 'a']})
+        self.assertNotIn('normalized_extras', merged[0])
+
 class ApiTest(TestCase):
     def setUp(self):
         self.org = Organization.objects.create(name="Org 1")
@@ -69,3 +132,1321 @@ class ApiTest(TestCase):
         request = factory.post('/api/orders/', data, content_type='application/json')
         view = OrderListCreateView.as_view()
         # Note: In real test, would need to force auth
+
+class JWTAuthenticationTest(TestCase):
+    def setUp(self):
+        from .authentication import principal_cache
+        principal_cache.clear()
+        self.user = User.objects.create_user(username="boss", password="pw", role="admin")
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {"username": "boss", "password": "pw"}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_principal_is_cached(self):
+        self.login()
+        with self.assertNumQueries(2): # user, counters
+            self.assertEqual(self.client.get('/api/admin/stats/').status_code, 200)
+        with self.assertNumQueries(1): # counters only
+            self.assertEqual(self.client.get('/api/admin/stats/').status_code, 200)
+
+    def test_role_change_revokes_tokens(self):
+        self.login()
+        self.client.get('/api/admin/stats/')
+        self.user.role = 'manager'
+        self.user.save()
+        self.assertEqual(self.user.token_version, 1)
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 401)
+        self.login()
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 403)
+        # Unrelated changes keep the tokens valid
+        self.user.first_name = 'Ann'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 403)
+
+    def test_partial_saves_revoke_tokens(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 401)
+        self.user.set_password('new')
+        self.user.save(update_fields=['password'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 2)
+        # Fields outside TOKEN_FIELDS don't
+        self.user.first_name = 'Ann'
+        self.user.save(update_fields=['first_name'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 2)
+
+    def test_password_hash_upgrade_keeps_tokens(self):
+        from django.contrib.auth.hashers import MD5PasswordHasher
+        from django.test import override_settings
+        User.objects.filter(pk=self.user.pk).update(password=MD5PasswordHasher().encode('pw', 'salt'))
+        # Logging in with a legacy hash re-saves it with the default hasher
+        with override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]):
+            self.login()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertFalse(user.password.startswith('md5$'))
+        self.assertEqual(user.token_version, 0)
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 200)
+
+    def test_stateless_mode_reads_role_from_claims(self):
+        from django.test import override_settings
+        self.login()
+        with override_settings(AUTH_STATELESS_JWT=True), self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/admin/stats/').status_code, 200)
+
+    def test_cache_is_bounded(self):
+        from django.test import override_settings
+        from .authentication import principal_cache
+        users = [User.objects.create_user(username=f"u{i}", password="pw") for i in range(3)]
+        with override_settings(AUTH_PRINCIPAL_CACHE_SIZE=2):
+            for user in users:
+                principal_cache.put(user)
+        self.assertIsNone(principal_cache.get(users[0].pk, 0))
+        self.assertEqual(principal_cache.get(users[2].pk, 0).username, "u2")
+        with override_settings(AUTH_PRINCIPAL_CACHE_TTL=-1):
+            principal_cache.put(users[2])
+        self.assertIsNone(principal_cache.get(users[2].pk, 0))
+
+
+class OrderCreateQueryTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        org = Organization.objects.create(name="Org 1")
+        self.contact = Contact.objects.create(first_name="John", last_name="Doe", email="j@example.com", organization=org)
+        self.products = []
+        for i in range(50):
+            product = Product.objects.create(name=f"Prod {i}", sku=f"P{i}", base_price=Decimal('10.00'), offer_percent=Decimal('10.00'))
+            SizePrice.objects.create(product=product, size_name="M", price=Decimal('20.00'))
+            self.products.append(product)
+
+    def post_order(self, n_lines):
+        items = [{"product_id": p.id, "size_name": "M" if i % 2 else "L", "qty": 2} for i, p in enumerate(self.products[:n_lines])]
+        return self.client.post('/api/orders/', {"contact": self.contact.id, "items": items}, format='json')
+
+    def test_query_count_is_constant(self):
+        # Cold catalog: products, sizes, savepoint, order insert, stats deltas, bulk item insert, release savepoint
+        with self.assertNumQueries(7):
+            response = self.post_order(1)
+        self.assertEqual(response.status_code, 201)
+        # Warm catalog: no catalog queries
+        with self.assertNumQueries(5):
+            response = self.post_order(50)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OrderItem.objects.filter(order_id=response.data['id']).count(), 50)
+
+    def test_prices_match_single_item_logic(self):
+        response = self.post_order(2)
+        # L falls back to base_price, M uses SizePrice; both get the 10% offer
+        self.assertEqual([i['unit_price'] for i in response.data['items']], [9.0, 18.0])
+        self.assertEqual(response.data['order_total'], 54.0)
+        order = Order.objects.get(id=response.data['id'])
+        self.assertEqual((order.total, order.line_count), (Decimal('54.00'), 2))
+
+    def test_order_number_collision_is_retried(self):
+        from unittest import mock
+        Order.objects.create(order_no="ORD-20250101-TAKEN000", contact=self.contact)
+        with mock.patch('crm_core.logic.generate_order_number', side_effect=["ORD-20250101-TAKEN000", "ORD-20250101-FREE0000"]):
+            response = self.post_order(1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['order_no'], "ORD-20250101-FREE0000")
+
+    def test_unknown_product_rejected(self):
+        response = self.client.post('/api/orders/', {"contact": self.contact.id, "items": [{"product_id": 999999, "size_name": "M"}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+
+
+class IdempotencyKeyTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        org = Organization.objects.create(name="Org 1")
+        self.contact = Contact.objects.create(first_name="John", last_name="Doe", email="j@example.com", organization=org)
+        self.product = Product.objects.create(name="Prod", sku="IK1", base_price=Decimal('10.00'))
+        self.body = {"contact": self.contact.id, "items": [{"product_id": self.product.id, "size_name": "M", "qty": 2}]}
+
+    def post(self, key, body=None, client=None):
+        return (client or self.client).post('/api/orders/', body or self.body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        first = self.post("retry-1")
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(5): # failed claim (savepoint, insert, rollback, release) and lookup; no pricing or writes
+            again = self.post("retry-1")
+        self.assertEqual(again.status_code, 201)
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        # Without a key, or with another one, a new order is created
+        self.post("retry-2")
+        self.client.post('/api/orders/', self.body, format='json')
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_key_reused_for_other_request(self):
+        self.post("k")
+        other = dict(self.body, items=[{"product_id": self.product.id, "size_name": "L", "qty": 1}])
+        self.assertEqual(self.post("k", other).status_code, 422)
+
+    def test_in_progress_and_abandoned_keys(self):
+        from django.utils import timezone
+        from .idempotency import request_fingerprint
+        from .models import IdempotencyKey
+        record = IdempotencyKey.objects.create(user=self.user, key="k", fingerprint=request_fingerprint(self.body))
+        self.assertEqual(self.post("k").status_code, 409)
+        self.assertEqual(Order.objects.count(), 0)
+        # The first request died without finishing: a retry after the lock timeout takes the key over
+        IdempotencyKey.objects.filter(pk=record.pk).update(created_at=timezone.now() - datetime.timedelta(minutes=5))
+        self.assertEqual(self.post("k").status_code, 201)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        from .models import IdempotencyKey
+        bad = dict(self.body, items=[{"product_id": 999999, "size_name": "M"}])
+        self.assertEqual(self.post("k", bad).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post("k").status_code, 201)
+
+    def test_keys_are_per_user_and_expire(self):
+        from django.utils import timezone
+        from .idempotency import purge_expired
+        from .models import IdempotencyKey
+        other_client = APIClient()
+        other_client.force_authenticate(User.objects.create_user(username="u2", password="pw"))
+        self.post("shared")
+        self.assertNotIn('Idempotent-Replayed', self.post("shared", client=other_client))
+        self.assertEqual(Order.objects.count(), 2)
+        IdempotencyKey.objects.update(created_at=timezone.now() - datetime.timedelta(days=2))
+        self.assertEqual(purge_expired(), 2)
+
+
+class QuoteTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.third_off = Product.objects.create(name="Third off", sku="Q1", base_price=Decimal('10.00'), offer_percent=Decimal('33.33'))
+        SizePrice.objects.create(product=self.third_off, size_name="M", price=Decimal('19.99'))
+        self.half_off = Product.objects.create(name="Half off", sku="Q2", base_price=Decimal('1.01'), offer_percent=Decimal('50.00'))
+
+    def quote(self, items):
+        return self.client.post('/api/pricing/quote', {"items": items}, format='json')
+
+    def test_prices_are_rounded_per_unit(self):
+        response = self.quote([
+            {"product_id": self.third_off.id, "size_name": "L", "qty": 3},   # 6.667 -> 6.67
+            {"product_id": self.third_off.id, "size_name": "M"},             # 13.327333 -> 13.33
+            {"product_id": self.half_off.id, "size_name": "M", "qty": 2},    # 0.505 -> 0.51 (half up)
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(i['unit_price'], i['line_total']) for i in response.data['items']],
+                         [('6.67', '20.01'), ('13.33', '13.33'), ('0.51', '1.02')])
+        self.assertEqual((response.data['total'], response.data['line_count']), ('34.36', 3))
+        self.assertFalse(Order.objects.exists())
+
+    def test_quote_matches_order(self):
+        org = Organization.objects.create(name="Org")
+        contact = Contact.objects.create(first_name="A", last_name="B", email="quote@example.com", organization=org)
+        items = [{"product_id": self.third_off.id, "size_name": "L", "qty": 3}]
+        quote = self.quote(items)
+        response = self.client.post('/api/orders/', {"contact": contact.id, "items": items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual((order.total, order.items.get().unit_price), (Decimal('20.01'), Decimal('6.67')))
+        self.assertEqual(Decimal(quote.data['total']), order.total)
+
+    def test_large_batch_uses_catalog(self):
+        items = [{"product_id": p.id, "size_name": s, "qty": q} for q in range(1, 501) for p, s in ((self.third_off, "M"), (self.half_off, "S"))]
+        with self.assertNumQueries(2): # cold catalog: products and sizes
+            self.quote(items[:1])
+        with self.assertNumQueries(0):
+            response = self.quote(items)
+        self.assertEqual(response.data['line_count'], 1000)
+        self.assertEqual(Decimal(response.data['total']), (Decimal('13.33') + Decimal('0.51')) * 500 * 501 / 2)
+
+    def test_invalid_lines(self):
+        response = self.quote([{"product_id": self.half_off.id, "size_name": "M", "qty": 0}, {"product_id": "x", "size_name": "M"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['errors']), {0, 1})
+        response = self.quote([{"product_id": 999999, "size_name": "M"}])
+        self.assertEqual((response.status_code, response.data['product_ids']), (400, [999999]))
+        self.assertEqual(self.quote([]).status_code, 400)
+
+
+class AsyncEndpointTest(TestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        user = User.objects.create_user(username="async", password="pw")
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        org = Organization.objects.create(name="Org A")
+        self.contact = Contact.objects.create(first_name="Ann", last_name="Lee", email="ann@example.com", organization=org)
+        self.product = Product.objects.create(name="Tee", sku="T1", base_price=Decimal('10.00'), offer_percent=Decimal('10.00'))
+        SizePrice.objects.create(product=self.product, size_name="M", price=Decimal('20.00'))
+
+    async def test_order_create_and_detail_match_sync_api(self):
+        body = {"contact": self.contact.id, "items": [
+            {"product_id": self.product.id, "size_name": "M", "qty": 1},
+            {"product_id": self.product.id, "size_name": "M", "qty": 2},
+        ]}
+        response = await self.async_client.post('/api/async/orders/', body, content_type='application/json', headers=self.auth)
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(created['order_total'], 54.0)
+        self.assertEqual(created['items'][0]['qty'], 3)
+
+        response = await self.async_client.get(f"/api/async/orders/{created['id']}/", headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        detail = response.json()
+        self.assertEqual(detail['order_no'], created['order_no'])
+        self.assertEqual(detail["contact"], self.contact.id)
+        self.assertEqual(await OrderItem.objects.filter(order_id=created['id']).acount(), 1)
+
+    async def test_product_list_and_auth(self):
+        response = await self.async_client.get('/api/async/products/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/async/products/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['sizes'][0]['size_name'], "M")
+        response = await self.async_client.get('/api/async/health/')
+        self.assertEqual(response.json()['status'], "ok")
+
+    async def test_invalid_order_rejected(self):
+        response = await self.async_client.post('/api/async/orders/', {"contact": self.contact.id, "items": [{"product_id": 999999, "size_name": "M"}]}, content_type='application/json', headers=self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(await Order.objects.acount(), 0)
+
+    async def test_order_create_idempotency_key(self):
+        body = {"contact": self.contact.id, "items": [{"product_id": self.product.id, "size_name": "M", "qty": 1}]}
+        headers = dict(self.auth, **{'Idempotency-Key': 'async-1'})
+        first = await self.async_client.post('/api/async/orders/', body, content_type='application/json', headers=headers)
+        again = await self.async_client.post('/api/async/orders/', body, content_type='application/json', headers=headers)
+        self.assertEqual((first.status_code, again.status_code), (201, 201))
+        self.assertEqual((again.json(), again['Idempotent-Replayed']), (first.json(), 'true'))
+        self.assertEqual(await Order.objects.acount(), 1)
+
+
+class PriceCatalogTest(TestCase):
+    def setUp(self):
+        from .catalog import price_catalog
+        self.catalog = price_catalog
+        self.product = Product.objects.create(name="Prod", sku="PC1", base_price=Decimal('100.00'), offer_percent=Decimal('10.00'))
+        self.size = SizePrice.objects.create(product=self.product, size_name="M", price=Decimal('120.00'))
+
+    def test_warm_lookups_need_no_queries(self):
+        self.catalog.refresh()
+        hits = self.catalog.hits
+        with self.assertNumQueries(0):
+            self.assertEqual(calculate_item_price(self.product, "M"), Decimal('120.00'))
+            self.assertEqual(self.catalog.snapshot().effective_price(self.product.id, "L"), Decimal('90.00'))
+        self.assertEqual(self.catalog.hits, hits + 2)
+
+    def test_signals_invalidate_snapshot(self):
+        self.catalog.snapshot()
+        self.size.price = Decimal('130.00')
+        self.size.save()
+        misses = self.catalog.misses
+        self.assertEqual(calculate_item_price(self.product, "M"), Decimal('130.00'))
+        self.assertEqual(self.catalog.misses, misses + 1)
+
+        self.size.delete()
+        self.assertEqual(calculate_item_price(self.product, "M"), Decimal('100.00'))
+
+    def test_partial_refresh(self):
+        self.catalog.snapshot()
+        Product.objects.filter(id=self.product.id).update(base_price=Decimal('200.00'))
+        self.assertEqual(calculate_item_price(self.product, "L"), Decimal('100.00')) # update() bypasses signals
+        self.catalog.refresh(product_ids=[self.product.id])
+        self.assertEqual(calculate_item_price(self.product, "L"), Decimal('200.00'))
+
+    def test_other_process_catches_up_within_max_age(self):
+        import time
+        from unittest import mock
+        from django.test import override_settings
+        from .catalog import PriceCatalog
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'other': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other-process'},
+        }
+        with override_settings(CACHES=caches, PRICE_CATALOG_MAX_AGE=60):
+            # A second worker: its own snapshot, version key in a cache this process does not write to
+            other = PriceCatalog(cache_alias='other')
+            self.assertEqual(other.snapshot().unit_price(self.product.id, "M"), Decimal('120.00'))
+            self.size.price = Decimal('130.00')
+            self.size.save()
+            self.assertEqual(other.snapshot().unit_price(self.product.id, "M"), Decimal('120.00'))
+            with mock.patch('time.monotonic', return_value=time.monotonic() + 60):
+                self.assertEqual(other.snapshot().unit_price(self.product.id, "M"), Decimal('130.00'))
+
+class ListQueryCountTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.n = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.n += 1
+            org = Organization.objects.create(name=f"Org {self.n}")
+            contact = Contact.objects.create(first_name="A", last_name="B", email=f"c{self.n}@example.com", phone="1", organization=org)
+            product = Product.objects.create(name=f"Prod {self.n}", sku=f"LQ{self.n}", base_price=Decimal('10.00'))
+            SizePrice.objects.create(product=product, size_name="M", price=Decimal('12.50'))
+            SizePrice.objects.create(product=product, size_name="L", price=Decimal('15.00'))
+            order = Order.objects.create(order_no=f"ORD-LQ-{self.n}", contact=contact)
+            for size_name in ("M", "L"):
+                OrderItem.objects.create(order=order, product=product, size_name=size_name, qty=1,
+                                         unit_price=Decimal('12.50'), line_total=Decimal('12.50'), extras={'x': [1]})
+
+    def count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_queries_do_not_grow(self):
+        urls = ['/api/organizations/', '/api/contacts/', '/api/products/', '/api/orders/']
+        self.add_rows(2)
+        before = [self.count_queries(url) for url in urls]
+        self.add_rows(20)
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_detail_queries(self):
+        self.add_rows(1)
+        order = Order.objects.get()
+        # Order joined with contact, items joined with product
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/orders/{order.id}/')
+        product = Product.objects.get()
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/products/{product.id}/')
+
+    def test_read_serializers_match_model_serializers(self):
+        from .serializers import (
+            OrganizationSerializer, ContactSerializer, ProductSerializer, OrderSerializer,
+            OrganizationReadSerializer, ContactReadSerializer, ProductReadSerializer, OrderReadSerializer,
+        )
+        self.add_rows(1)
+        pairs = [
+            (Organization.objects.get(), OrganizationSerializer, OrganizationReadSerializer),
+            (Contact.objects.get(), ContactSerializer, ContactReadSerializer),
+            (Product.objects.get(), ProductSerializer, ProductReadSerializer),
+            (Order.objects.get(), OrderSerializer, OrderReadSerializer),
+        ]
+        for instance, model_serializer, read_serializer in pairs:
+            expected = model_serializer(instance).data
+            actual = read_serializer(instance).data
+            self.assertEqual(list(actual.keys()), list(expected.keys()))
+            self.assertEqual(actual, expected)
+
+class KeysetPaginationTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        org = Organization.objects.create(name="Org 1")
+        contact = Contact.objects.create(first_name="A", last_name="B", email="a@example.com", organization=org)
+        for i in range(7):
+            Organization.objects.create(name=f"Org {i + 2}")
+            Order.objects.create(order_no=f"ORD-PG-{i}", contact=contact)
+        # Ties on created_at must be broken by id
+        Order.objects.filter(order_no__in=["ORD-PG-2", "ORD-PG-3", "ORD-PG-4"]).update(
+            created_at=Order.objects.get(order_no="ORD-PG-3").created_at)
+
+    def walk(self, url):
+        pages = []
+        while url:
+            data = self.client.get(url).data
+            pages.append([row['id'] for row in data['results']])
+            url = data['next']
+        return pages
+
+    def test_forward_pages_cover_all_rows_once(self):
+        pages = self.walk('/api/organizations/?page_size=3')
+        self.assertEqual([len(p) for p in pages], [3, 3, 2])
+        self.assertEqual(sum(pages, []), list(Organization.objects.order_by('id').values_list('id', flat=True)))
+
+        orders = sum(self.walk('/api/orders/?page_size=2'), [])
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(orders, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/orders/?page_size=3').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNotNone(back['next'])
+
+    def test_page_size_is_capped(self):
+        from .pagination import KeysetPagination
+        response = self.client.get('/api/organizations/?page_size=100000')
+        self.assertEqual(len(response.data['results']), min(8, KeysetPagination.max_page_size))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/orders/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_later_pages_cost_the_same(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        first = self.client.get('/api/orders/?page_size=2').data
+        cache.clear() # measure the database, not the response cache
+        with CaptureQueriesContext(connection) as page_one:
+            self.client.get('/api/orders/?page_size=2')
+        with CaptureQueriesContext(connection) as page_two:
+            self.client.get(first['next'])
+        self.assertEqual(len(page_one.captured_queries), len(page_two.captured_queries))
+        self.assertNotIn('OFFSET', page_two.captured_queries[0]['sql'])
+
+class ConditionalGetTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name="Cap", sku="CAP1", base_price=Decimal('5.00'))
+        SizePrice.objects.create(product=self.product, size_name="M", price=Decimal('6.00'))
+
+    def set_version(self, resource, seconds_ago):
+        import time
+        from .http_cache import get_cache, version_key
+        get_cache().set(version_key(resource), time.time_ns() - int(seconds_ago * 1e9), timeout=None)
+
+    def test_if_none_match_returns_304_without_queries(self):
+        self.set_version('products', 2)
+        first = self.client.get('/api/products/')
+        etag = first['ETag']
+        self.assertTrue(first.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Another URL of the same resource has its own ETag
+        self.assertNotEqual(self.client.get(f'/api/products/{self.product.id}/')['ETag'], etag)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        first = self.client.get('/api/products/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/products/')['ETag']
+        SizePrice.objects.create(product=self.product, size_name="L", price=Decimal('7.00'))
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results'][0]['sizes']), 2)
+
+    def test_if_modified_since(self):
+        self.set_version('products', 2)
+        response = self.client.get('/api/products/')
+        again = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_if_modified_since_ignored_within_the_version_second(self):
+        from django.utils.http import http_date
+        self.set_version('products', 0)
+        response = self.client.get('/api/products/')
+        self.assertFalse(response.has_header('Last-Modified'))
+        # A date covering a version that can still change within its second does not give a 304
+        again = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(again.status_code, 200)
+
+    def test_versions_outlive_quiet_periods(self):
+        import time
+        from unittest import mock
+        from .http_cache import resource_version
+        version = resource_version('products')
+        with mock.patch('time.time', return_value=time.time() + 3600):
+            self.assertEqual(resource_version('products'), version)
+
+    def test_recent_writes_are_built_from_the_primary(self):
+        from unittest import mock
+        from django.utils.connection import ConnectionDoesNotExist
+        from .http_cache import get_cache, written_key
+        self.product.name = "Hat"
+        self.product.save()
+        # An alias that does not exist: any read sent to a replica would fail
+        with mock.patch('crm_core.db_routers.replica_aliases', return_value=['replica_missing']):
+            self.assertEqual(self.client.get('/api/products/').json()['results'][0]['name'], "Hat")
+            # Once REPLICA_MAX_LAG is over, reads go to the replicas again
+            get_cache().delete(written_key('products'))
+            with self.assertRaises(ConnectionDoesNotExist):
+                self.client.get('/api/products/?page_size=1')
+
+    def test_related_write_invalidates_orders(self):
+        org = Organization.objects.create(name="Org")
+        contact = Contact.objects.create(first_name="Ann", last_name="Lee", email="ann@example.com", organization=org)
+        order = Order.objects.create(order_no="ORD-ETAG-1", contact=contact)
+        url = f'/api/orders/{order.id}/'
+        etag = self.client.get(url)['ETag']
+        contact.first_name = "Anna"
+        contact.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['contact_name'], "Anna")
+
+class BootstrapTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.n = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.n += 1
+            org = Organization.objects.create(name=f"Org {self.n}")
+            Contact.objects.create(first_name="A", last_name=f"B{self.n}", email=f"c{self.n}@example.com", organization=org)
+            product = Product.objects.create(name=f"Prod {self.n}", sku=f"BS{self.n}", base_price=Decimal('10.00'))
+            SizePrice.objects.create(product=product, size_name="M", price=Decimal('12.50'))
+
+    def test_sections_match_the_list_endpoints(self):
+        self.add_rows(3)
+        data = self.client.get('/api/bootstrap/?page_size=2').json()
+        self.assertEqual(data['organizations'], {str(o.id): o.name for o in Organization.objects.all()})
+        contacts = self.client.get('/api/contacts/?page_size=2').json()
+        self.assertEqual(data['contacts']['results'], contacts['results'])
+        self.assertEqual(data['contacts']['next'], contacts['next'])
+        products = self.client.get('/api/products/').json()['results']
+        self.assertEqual(data['catalog'], [{
+            'id': p['id'], 'name': p['name'], 'base_price': p['base_price'], 'offer_percent': p['offer_percent'],
+            'sizes': [{'size_name': s['size_name'], 'price': s['price']} for s in p['sizes']],
+        } for p in products])
+        self.assertEqual(data['stats'], {'total_organizations': 3, 'total_contacts': 3, 'total_products': 3, 'total_orders': 0})
+
+    def test_fixed_query_count(self):
+        from .catalog import price_catalog
+        for rows in (1, 20):
+            self.add_rows(rows)
+            cache.clear()
+            price_catalog.invalidate()
+            with self.assertNumQueries(5): # organizations, contacts, products and sizes (cold catalog), counters
+                self.client.get('/api/bootstrap/')
+            with self.assertNumQueries(0):
+                self.client.get('/api/bootstrap/')
+
+    def test_include_and_invalidation(self):
+        self.add_rows(1)
+        response = self.client.get('/api/bootstrap/?include=organizations')
+        self.assertEqual(list(response.json()), ['organizations'])
+        self.assertEqual(self.client.get('/api/bootstrap/?include=orders').status_code, 400)
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/bootstrap/?include=organizations', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Organization.objects.create(name="Org new")
+        response = self.client.get('/api/bootstrap/?include=organizations', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['organizations']), 2)
+
+class DeltaSyncTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name="Org")
+        self.contacts = [
+            Contact.objects.create(first_name=f"C{i}", last_name="L", email=f"c{i}@example.com", organization=self.org)
+            for i in range(5)
+        ]
+        self.product = Product.objects.create(name="Cap", sku="SYNC1", base_price=Decimal('5.00'))
+        self.size = SizePrice.objects.create(product=self.product, size_name="M", price=Decimal('6.00'))
+        self.order = Order.objects.create(order_no="ORD-SYNC-1", contact=self.contacts[0])
+        OrderItem.objects.create(order=self.order, product=self.product, size_name="M", qty=1,
+                                 unit_price=Decimal('6.00'), line_total=Decimal('6.00'))
+        # Everything so far happened well before the settle window
+        past = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=2)
+        for model in (Organization, Contact, Product, SizePrice, Order, OrderItem):
+            model.objects.update(updated_at=past)
+
+    def sync(self, resource, since='0', page_size=2):
+        results, deleted, url = [], [], f'/api/{resource}/?since={since}&page_size={page_size}'
+        while url:
+            data = self.client.get(url).json()
+            results += data['results']
+            deleted += data['deleted']
+            cursor, url = data['cursor'], data['next']
+        return results, deleted, cursor
+
+    def test_changes_since_cursor(self):
+        results, deleted, cursor = self.sync('contacts')
+        self.assertEqual(sorted(r['id'] for r in results), sorted(c.id for c in self.contacts))
+        self.assertEqual((deleted, self.sync('contacts', cursor)[:2]), ([], ([], [])))
+
+        self.contacts[1].phone = "555"
+        self.contacts[1].save()
+        deleted_id = self.contacts[2].id
+        self.contacts[2].delete()
+        results, deleted, _ = self.sync('contacts', cursor)
+        self.assertEqual([(r['id'], r['phone']) for r in results], [(self.contacts[1].id, "555")])
+        self.assertEqual(deleted, [deleted_id])
+
+    def test_late_commit_between_pages_is_sent(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        Contact.objects.update(updated_at=now - datetime.timedelta(seconds=30))
+        seen, url = [], '/api/contacts/?since=0&page_size=2'
+        data = self.client.get(url).json()
+        seen += [r['id'] for r in data['results']]
+        # Written by a transaction that started 45 seconds ago and commits after the first page
+        late = Contact.objects.create(first_name="Late", last_name="L", email="late@example.com", organization=self.org)
+        Contact.objects.filter(pk=late.pk).update(updated_at=now - datetime.timedelta(seconds=45))
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [r['id'] for r in data['results']]
+        seen += [r['id'] for r in self.sync('contacts', data['cursor'])[0]]
+        self.assertIn(late.id, seen)
+
+    def test_shown_rows_are_touched(self):
+        cursors = {resource: self.sync(resource)[2] for resource in ('contacts', 'products', 'orders')}
+        self.size.price = Decimal('7.00')
+        self.size.save()
+        self.assertEqual([p['sizes'][0]['price'] for p in self.sync('products', cursors['products'])[0]], ['7.00'])
+
+        self.org.address = "Street 1"
+        self.org.save()
+        self.assertEqual(self.sync('contacts', cursors['contacts'])[0], [])
+        self.org.name = "Org renamed"
+        self.org.save()
+        # Paging stops at rows changed within SYNC_SETTLE_TIME, so they have to fit in one page
+        self.assertEqual(len(self.sync('contacts', cursors['contacts'], page_size=10)[0]), 5)
+
+        self.contacts[0].first_name = "Ann"
+        self.contacts[0].save()
+        self.assertEqual([o['contact_name'] for o in self.sync('orders', cursors['orders'])[0]], ["Ann"])
+
+    def test_expired_cursor_and_purge(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Tombstone
+        from .sync import SyncPagination
+        old = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=31)
+        cursor = SyncPagination('contacts').cursor_token([old, 0])
+        self.assertEqual(self.client.get(f'/api/contacts/?since={cursor}').status_code, 410)
+
+        self.contacts[3].delete()
+        Tombstone.objects.update(deleted_at=old)
+        recent_id = self.contacts[4].id
+        self.contacts[4].delete()
+        call_command('purge_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [recent_id])
+
+class ResponseEncodingTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(30):
+            product = Product.objects.create(name=f"Prod {i}", sku=f"ENC{i}", base_price=Decimal('5.00'))
+            SizePrice.objects.create(product=product, size_name="M", price=Decimal('6.00'))
+
+    def test_fast_json_matches_json_renderer(self):
+        import datetime
+        from django.utils import timezone
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {
+            'results': self.client.get('/api/products/').json()['results'],
+            'price': Decimal('9.50'), 'at': timezone.now(), 'day': datetime.date(2025, 1, 2),
+            'message': gettext_lazy("Not found."), 'errors': {0: 'bad'}, 'name': "Zoë",
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_large_responses_are_gzipped(self):
+        import gzip
+        plain = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        # The weak ETag of the compressed body still revalidates
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        # Below COMPRESSION_MIN_SIZE bodies are sent as they are
+        small = self.client.get(f'/api/products/{Product.objects.first().id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_brotli(self):
+        from . import middleware
+        if middleware.brotli is None:
+            self.skipTest("brotli is not installed")
+        response = self.client.get('/api/products/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.client.get('/api/products/').content)
+
+    def test_msgpack(self):
+        from . import renderers
+        if renderers.msgpack is None:
+            self.skipTest("msgpack is not installed")
+        json_response = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), json_response.json())
+        self.assertNotEqual(response['ETag'], json_response['ETag'])
+        product = Product.objects.first()
+        body = renderers.msgpack.packb({"items": [{"product_id": product.id, "size_name": "M", "qty": 2}]})
+        quote = self.client.post('/api/pricing/quote', body, content_type='application/msgpack')
+        self.assertEqual(quote.status_code, 200)
+
+
+class PerformanceMiddlewareTest(AuthenticatedTestCase):
+    role = 'admin'
+
+    def setUp(self):
+        super().setUp()
+        from .perf import perf_registry
+        perf_registry.reset()
+        Product.objects.create(name="Cap", sku="CAP1", base_price=Decimal('5.00'))
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get('/api/products/')
+        self.assertRegex(response['Server-Timing'], r'total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serializer;dur=[\d.]+')
+        stats = self.client.get('/api/admin/perf/').data
+        products = stats['product-list']
+        self.assertEqual(products['requests'], 1)
+        self.assertEqual(products['bytes']['max'], len(response.content))
+        self.assertGreater(products['queries']['p50'], 0)
+        self.assertGreater(products['serializer_ms']['max'], 0)
+        self.assertLessEqual(products['wall_ms']['p50'], products['wall_ms']['p99'])
+
+    def test_perf_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="m", password="pw"))
+        self.assertEqual(client.get('/api/admin/perf/').status_code, 403)
+
+    def test_histogram_percentiles(self):
+        from .perf import Histogram
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value)
+        # Log buckets are ~19% wide
+        self.assertAlmostEqual(histogram.percentile(50), 50, delta=10)
+        self.assertAlmostEqual(histogram.percentile(99), 99, delta=1)
+        self.assertEqual(histogram.summary()['max'], 100)
+
+    def test_n_plus_one_detector(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .middleware import PerformanceMiddleware
+
+        def view(request):
+            for org in Organization.objects.all():
+                list(org.contacts.all())
+            return HttpResponse('ok')
+
+        for i in range(6):
+            Organization.objects.create(name=f"Org {i}")
+        with self.settings(PERF_DETECT_N_PLUS_ONE=True):
+            middleware = PerformanceMiddleware(view)
+        with self.assertLogs('crm_core.perf', 'WARNING') as logs:
+            middleware(RequestFactory().get('/n-plus-one/'))
+        self.assertIn('query ran 6 times', logs.output[0])
+
+class DatabaseConfigTest(TestCase):
+    def test_sqlite_pragmas_applied(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1) # NORMAL
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2) # MEMORY
+
+    def test_reads_stay_on_primary_without_replicas(self):
+        from .db_routers import ReplicaRouter, read_alias
+        self.assertEqual(read_alias(), 'default')
+        router = ReplicaRouter()
+        org = Organization.objects.create(name="Org")
+        org._state.db = 'replica_0'
+        # Related lookups follow the instance, writes and migrations always use the primary
+        self.assertEqual(router.db_for_read(Contact, instance=org), 'replica_0')
+        self.assertEqual(router.db_for_read(Contact), 'default')
+        self.assertEqual(router.db_for_write(Organization, instance=org), 'default')
+        self.assertFalse(router.allow_migrate('replica_0', 'crm_core'))
+
+    def test_list_views_read_from_replica(self):
+        from unittest import mock
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="u1", password="pw"))
+        with mock.patch('crm_core.views.read_alias', return_value='default') as read_alias:
+            self.assertEqual(client.get('/api/organizations/').status_code, 200)
+        read_alias.assert_called_once()
+
+class ServeTest(TestCase):
+    def test_workers_get_distinct_order_number_ids(self):
+        from types import SimpleNamespace
+        from unittest import mock
+        from django.test import override_settings
+        from .order_numbers import get_generator
+        try:
+            from mini_crm import serve
+        except ImportError:
+            self.skipTest("gunicorn is not installed")
+        server = SimpleNamespace(WORKERS={})
+        workers = []
+        for pid in (101, 102, 103):
+            worker = SimpleNamespace()
+            serve.pre_fork(server, worker)
+            server.WORKERS[pid] = worker
+            workers.append(worker)
+        self.assertEqual([w.slot for w in workers], [0, 1, 2])
+        del server.WORKERS[102]  # a recycled worker's slot is reused
+        replacement = SimpleNamespace()
+        serve.pre_fork(server, replacement)
+        self.assertEqual(replacement.slot, 1)
+
+        with override_settings(ORDER_NUMBER_WORKER_ID=8, ORDER_NUMBER_GENERATOR='crm_core.order_numbers.TimeOrderedGenerator'), \
+                mock.patch('crm_core.order_numbers._generators', {}):
+            serve.post_fork(server, workers[2])
+            from django.conf import settings
+            self.assertEqual(settings.ORDER_NUMBER_WORKER_ID, 10)
+            self.assertEqual(get_generator().worker_id, 10)
+
+    def test_several_workers_need_a_shared_cache(self):
+        from unittest import mock
+        from django.test import override_settings
+        try:
+            from mini_crm import serve
+        except ImportError:
+            self.skipTest("gunicorn is not installed")
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local), mock.patch.object(serve, 'Server') as server, \
+                self.assertLogs('gunicorn.error', 'WARNING'):
+            serve.main(['--workers', '2'])
+        self.assertEqual(server.call_args[0][0]['workers'], 1)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=shared):
+            self.assertTrue(serve.has_shared_cache())
+
+
+class ExportTest(AuthenticatedTestCase):
+    def setUp(self):
+        super().setUp()
+        org = Organization.objects.create(name="Org 1")
+        self.contact = Contact.objects.create(first_name="A", last_name="B", email="a@example.com", phone="1", organization=org)
+        product = Product.objects.create(name="Prod", sku="EX1", base_price=Decimal('10.00'))
+        SizePrice.objects.create(product=product, size_name="M", price=Decimal('12.00'))
+        self.orders = []
+        for i in range(3):
+            order = Order.objects.create(order_no=f"ORD-EX-{i}", contact=self.contact)
+            OrderItem.objects.create(order=order, product=product, size_name="M", qty=2,
+                                     unit_price=Decimal('12.00'), line_total=Decimal('24.00'), extras={'a': 1})
+            self.orders.append(order)
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_totals_beyond_line_precision(self):
+        # Each line fits max_digits=10, the order total needs Order.total's 12
+        product = Product.objects.create(name="Big", sku="EX-BIG", base_price=Decimal('60000000.00'))
+        response = self.client.post('/api/orders/', {"contact": self.contact.id, "items": [
+            {"product_id": product.id, "size_name": "M", "qty": 1},
+            {"product_id": product.id, "size_name": "L", "qty": 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        order_id = response.data['id']
+        self.assertEqual(self.client.get(f'/api/orders/{order_id}/').json()['total'], '120000000.00')
+        self.assertEqual(self.client.get('/api/orders/').json()['results'][0]['total'], '120000000.00')
+        self.assertIn('"total":"120000000.00"', self.read('/api/export/orders.ndjson').replace(' ', ''))
+
+    def test_orders_ndjson(self):
+        import json
+        lines = self.read('/api/export/orders.ndjson').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([r['order_no'] for r in rows], ["ORD-EX-0", "ORD-EX-1", "ORD-EX-2"])
+        self.assertEqual(rows[0]['items'][0]['line_total'], '24.00')
+
+    def test_orders_csv_date_filter(self):
+        import csv, datetime, io
+        Order.objects.filter(id=self.orders[0].id).update(created_at=self.orders[0].created_at - datetime.timedelta(days=10))
+        day = self.orders[1].created_at.date().isoformat()
+        rows = list(csv.DictReader(io.StringIO(self.read(f'/api/export/orders.csv?date_from={day}&date_to={day}'))))
+        self.assertEqual([r['order_no'] for r in rows], ["ORD-EX-1", "ORD-EX-2"])
+        self.assertEqual(rows[0]['product_name'], "Prod")
+
+    def test_contacts_and_products(self):
+        self.assertIn('"organization_name": "Org 1"', self.read('/api/export/contacts.ndjson'))
+        self.assertIn('EX1', self.read('/api/export/products.csv').splitlines()[1])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/export/orders.ndjson?date_from=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/orders.xml').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/users.csv').status_code, 404)
+
+class BulkImportTest(AuthenticatedTestCase):
+    role = 'admin'
+
+    def test_contacts_upsert_and_org_resolution(self):
+        existing_org = Organization.objects.create(name="Acme")
+        Contact.objects.create(first_name="Old", last_name="Name", email="a@example.com", phone="1", organization=existing_org)
+        rows = [
+            {"first_name": "Ann", "last_name": "A", "email": "a@example.com", "phone": "2", "organization": "Acme"},
+            {"first_name": "Bob", "last_name": "B", "email": "b@example.com", "phone": "3", "organization": "Globex"},
+            {"first_name": "Bad", "last_name": "Row", "email": "not-an-email", "phone": "4", "organization": "Globex"},
+        ]
+        response = self.client.post('/api/import/contacts/', rows, format='json')
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [3])
+        self.assertIn('email', response.data['errors'][0]['errors'])
+
+        ann = Contact.objects.get(email="a@example.com")
+        self.assertEqual((ann.first_name, ann.organization_id), ("Ann", existing_org.id))
+        self.assertEqual(Contact.objects.get(email="b@example.com").organization.name, "Globex")
+        self.assertEqual(Organization.objects.count(), 2)
+
+    def test_products_csv_with_sizes(self):
+        from .catalog import price_catalog
+        product = Product.objects.create(name="Old", sku="SKU1", base_price=Decimal('1.00'))
+        SizePrice.objects.create(product=product, size_name="M", price=Decimal('2.00'))
+        price_catalog.snapshot()
+        body = "name,sku,base_price,offer_percent,sizes\nShirt,SKU1,10.00,,M=12.00;L=14.00\nCap,SKU2,5.00,10,\nBroken,SKU3,abc,,\n"
+        response = self.client.generic('POST', '/api/import/products/', body, content_type='text/csv')
+        self.assertEqual(response.data['imported'], 2)
+        self.assertEqual([e['row'] for e in response.data['errors']], [3])
+        self.assertEqual(Product.objects.get(sku="SKU1").name, "Shirt")
+        self.assertEqual(Product.objects.get(sku="SKU2").offer_percent, Decimal('10.00'))
+        self.assertEqual(
+            sorted(SizePrice.objects.filter(product=product).values_list('size_name', 'price')),
+            [("L", Decimal('14.00')), ("M", Decimal('12.00'))])
+        # bulk writes still invalidate the price catalog
+        self.assertEqual(calculate_item_price(product, "M"), Decimal('12.00'))
+
+    def test_non_utf8_body_rejected(self):
+        body = "name,sku,base_price\nCaf\u00e9,SKU9,1.00\n".encode('latin-1')
+        response = self.client.generic('POST', '/api/import/products/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.exists())
+
+    def test_batches_and_command(self):
+        import os, tempfile
+        from django.core.management import call_command
+        from .imports import import_rows
+        rows = [{"name": f"Org {i}"} for i in range(25)] + [{"address": "no name"}]
+        result = import_rows('organizations', rows, batch_size=10)
+        self.assertEqual(result['imported'], 25)
+        self.assertEqual(result['errors'][0]['row'], 26)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('{"name": "Org 0", "gst_no": "GST0"}\n{"name": "Org X"}\nnot json\n')
+        try:
+            call_command('import_data', 'organizations', f.name, stdout=open(os.devnull, 'w'), stderr=open(os.devnull, 'w'))
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(Organization.objects.get(name="Org 0").gst_no, "GST0")
+        self.assertEqual(Organization.objects.count(), 26)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(User.objects.create_user(username="m", password="pw"))
+        self.assertEqual(self.client.post('/api/import/contacts/', [], format='json').status_code, 403)
+
+class SearchTest(AuthenticatedTestCase):
+    role = 'admin'
+
+    def setUp(self):
+        super().setUp()
+        self.acme = Organization.objects.create(name="Acme Widgets", address="12 Market St")
+        self.ann = Contact.objects.create(first_name="Annabel", last_name="Lee", email="annabel@acme.test", phone="555-123-4567", organization=self.acme)
+        Contact.objects.create(first_name="Bob", last_name="Annan", email="bob@globex.test", phone="555-000-1111", organization=self.acme)
+        Product.objects.create(name="Anniversary Mug", sku="MUG-1", base_price=Decimal('8.00'))
+
+    def search(self, q, **params):
+        response = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(r['type'], r['title']) for r in response.data['results']]
+
+    def test_ranked_prefix_search(self):
+        # Title matches rank above body-only matches; every kind is searched by default
+        results = self.search("ann")
+        self.assertEqual(set(results), {("contact", "Annabel Lee"), ("contact", "Bob Annan"), ("product", "Anniversary Mug")})
+        self.assertEqual(self.search("annab lee"), [("contact", "Annabel Lee")])
+        self.assertEqual(self.search("ann", type="products"), [("product", "Anniversary Mug")])
+        self.assertEqual(self.search(""), [])
+
+    def test_email_phone_and_organization(self):
+        self.assertEqual(self.search("annabel@acme"), [("contact", "Annabel Lee")])
+        self.assertEqual(self.search("5551234567"), [("contact", "Annabel Lee")])
+        self.assertEqual(self.search("acme", type="organizations"), [("organization", "Acme Widgets")])
+        self.assertEqual(len(self.search("widgets", type="contacts")), 2)
+
+    def test_index_follows_writes(self):
+        self.acme.name = "Initech"
+        self.acme.save()
+        self.assertEqual(len(self.search("initech", type="contacts")), 2)
+        self.ann.delete()
+        self.assertEqual(self.search("annabel"), [])
+
+    def test_contacts_reindexed_only_on_rename(self):
+        from .models import SearchEntry
+        SearchEntry.objects.filter(kind='contact', object_id=self.ann.id).delete()
+        self.acme.address = "1 Other St"
+        self.acme.save()
+        self.assertEqual(self.search("annabel"), [])
+        self.acme.name = "Initech"
+        self.acme.save()
+        self.assertEqual(self.search("annabel"), [("contact", "Annabel Lee")])
+
+    def test_bulk_import_is_indexed(self):
+        rows = [{"first_name": "Zed", "last_name": "Zulu", "email": "zed@example.com", "phone": "1", "organization": "Umbrella"}]
+        self.client.post('/api/import/contacts/', rows, format='json')
+        self.assertEqual(self.search("zulu"), [("contact", "Zed Zulu")])
+        self.assertEqual(self.search("umbrella", type="organizations"), [("organization", "Umbrella")])
+
+    def test_import_reindexes_only_its_rows(self):
+        from .models import SearchEntry
+        SearchEntry.objects.filter(kind='contact', object_id=self.ann.id).delete()
+        self.client.post('/api/import/organizations/', [{"name": "Acme Widgets", "address": "9 Harbor Rd"}], format='json')
+        self.client.post('/api/import/products/', [{"name": "Mug", "sku": "MUG-2", "base_price": "3.00"}], format='json')
+        self.assertEqual(self.search("harbor", type="organizations"), [("organization", "Acme Widgets")])
+        # A full rebuild would have brought it back
+        self.assertEqual(self.search("annabel"), [])
+
+    def test_invalid_type_rejected(self):
+        self.assertEqual(self.client.get('/api/search/', {'q': 'a', 'type': 'orders'}).status_code, 400)
+
+
+class StatsTest(AuthenticatedTestCase):
+    role = 'admin'
+
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name="Org 1")
+        self.contact = Contact.objects.create(first_name="A", last_name="B", email="a@example.com", organization=self.org)
+        self.product = Product.objects.create(name="Prod", sku="ST1", base_price=Decimal('10.00'))
+
+    def place_order(self, qty):
+        response = self.client.post('/api/orders/', {"contact": self.contact.id, "items": [
+            {"product_id": self.product.id, "size_name": "M", "qty": qty}]}, format='json')
+        return Order.objects.get(id=response.data['id'])
+
+    def test_counters_follow_writes(self):
+        self.place_order(2)
+        self.place_order(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/admin/stats/')
+        self.assertEqual(response.data, {
+            'total_organizations': 1, 'total_contacts': 1, 'total_products': 1,
+            'total_orders': 2, 'total_revenue': 50.0,
+        })
+        self.org.delete() # cascades to contact and orders
+        response = self.client.get('/api/admin/stats/')
+        self.assertEqual((response.data['total_contacts'], response.data['total_orders'], response.data['total_revenue']), (0, 0, 0.0))
+
+    def test_compaction(self):
+        import datetime
+        from .models import RevenueRollup, StatCounter
+        from .stats import compact_counters, compact_rollups, dashboard_stats
+        orders = [self.place_order(2), self.place_order(1)]
+        Order.objects.filter(id__in=[o.id for o in orders]).update(created_at=orders[0].created_at - datetime.timedelta(hours=1))
+        before = dashboard_stats()
+
+        self.assertEqual(compact_rollups(), 2)
+        self.assertEqual(compact_rollups(), 0)
+        compact_counters()
+        self.assertEqual(dashboard_stats(), before)
+        self.assertEqual(StatCounter.objects.exclude(name='rollup_order_id').count(), len(before))
+
+        product = RevenueRollup.objects.get(dimension='product', key=str(self.product.id))
+        self.assertEqual((product.orders, product.quantity, product.revenue), (2, 3, Decimal('30.00')))
+        self.assertEqual(RevenueRollup.objects.get(dimension='organization', key=str(self.org.id)).revenue, Decimal('30.00'))
+        response = self.client.get('/api/admin/stats/?breakdown=day')
+        self.assertEqual(response.data['breakdown'][0]['orders'], 2)
+
+        # A later order is added on top of the existing rollup rows
+        Order.objects.filter(id=self.place_order(1).id).update(created_at=orders[0].created_at - datetime.timedelta(hours=1))
+        self.assertEqual(compact_rollups(), 1)
+        product.refresh_from_db()
+        self.assertEqual((product.orders, product.quantity), (3, 4))
+
+    def test_deletes_and_line_changes_update_rollups(self):
+        import datetime
+        from .models import RevenueRollup
+        from .stats import compact_rollups
+        orders = [self.place_order(2), self.place_order(1)]
+        Order.objects.filter(id__in=[o.id for o in orders]).update(created_at=orders[0].created_at - datetime.timedelta(hours=1))
+        compact_rollups()
+
+        def rollup(dimension, key):
+            row = RevenueRollup.objects.filter(dimension=dimension, key=str(key)).first()
+            return row and (row.orders, row.quantity, row.revenue)
+
+        item = orders[0].items.get()
+        item.qty, item.line_total = 4, Decimal('40.00')
+        item.save()
+        self.assertEqual(rollup('product', self.product.id), (2, 5, Decimal('50.00')))
+        orders[1].delete()
+        self.assertEqual(rollup('product', self.product.id), (1, 4, Decimal('40.00')))
+        self.assertEqual(rollup('organization', self.org.id), (1, 4, Decimal('40.00')))
+        self.org.delete() # cascades to contact and orders
+        self.assertFalse(RevenueRollup.objects.exists())
+
+    def test_recount(self):
+        from .stats import dashboard_stats, recount
+        Organization.objects.bulk_create([Organization(name="Bulk 1"), Organization(name="Bulk 2")])
+        self.assertEqual(dashboard_stats()['total_organizations'], 1)
+        recount()
+        self.assertEqual(dashboard_stats()['total_organizations'], 3)
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        from .tasks import REGISTRY, task
+        self.calls = []
+        registry = dict(REGISTRY)
+        self.addCleanup(lambda: (REGISTRY.clear(), REGISTRY.update(registry)))
+        task('tests.record')(lambda value: self.calls.append(value))
+
+        def flaky():
+            raise ValueError("boom")
+        task('tests.flaky', max_attempts=2)(flaky)
+
+    def run_worker(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('worker', '--once', *args, stdout=StringIO())
+
+    def test_order_enqueues_rollup_refresh_on_commit(self):
+        from django.utils import timezone
+        from .models import Task
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="u1", password="pw"))
+        contact = Contact.objects.create(first_name="A", last_name="B", email="a@example.com",
+                                         organization=Organization.objects.create(name="Org 1"))
+        product = Product.objects.create(name="Prod", sku="TQ1", base_price=Decimal('10.00'))
+        body = {"contact": contact.id, "items": [{"product_id": product.id, "size_name": "M"}]}
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.post('/api/orders/', body, format='json').status_code, 201)
+        # Queued once per settle period, due after the orders have settled
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.status), ('refresh_rollups', 'pending'))
+        self.assertGreater(task.run_at, timezone.now())
+
+    def test_worker_runs_tasks_in_batches(self):
+        from .models import Task
+        from .tasks import enqueue
+        with self.captureOnCommitCallbacks(execute=True):
+            for value in range(3):
+                enqueue('tests.record', {'value': value})
+        self.run_worker('--batch-size', '2')
+        self.assertEqual(len(self.calls), 2)
+        self.run_worker('--batch-size', '2')
+        self.assertEqual(sorted(self.calls), [0, 1, 2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        from django.utils import timezone
+        from .models import Task
+        from .tasks import enqueue
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.flaky')
+        self.run_worker()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), ('pending', 1))
+        self.assertIn("ValueError: boom", task.last_error)
+        self.assertGreater(task.run_at, timezone.now())
+        # Not due yet
+        self.run_worker()
+        self.assertEqual(Task.objects.get().attempts, 1)
+        Task.objects.update(run_at=timezone.now())
+        self.run_worker()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), ('failed', 2))
+
+    def test_stale_running_task_is_reclaimed(self):
+        from django.utils import timezone
+        from .models import Task
+        from .tasks import claim_batch
+        Task.objects.create(name='tests.record', payload={'value': 1}, run_at=timezone.now(), status='running',
+                            locked_by='dead-worker', locked_at=timezone.now())
+        self.assertEqual(claim_batch(10, 'w1'), [])
+        Task.objects.update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        [task] = claim_batch(10, 'w1')
+        self.assertEqual((task.locked_by, task.attempts), ('w1', 1))
+
+
+class ReportTest(AuthenticatedTestCase):
+    role = 'admin'
+
+    def setUp(self):
+        super().setUp()
+        org = Organization.objects.create(name="Org 1")
+        self.ann = Contact.objects.create(first_name="Ann", last_name="A", email="a@example.com", organization=org)
+        bob = Contact.objects.create(first_name="Bob", last_name="B", email="b@example.com", organization=org)
+        self.shirt = Product.objects.create(name="Shirt", sku="R1", base_price=Decimal('10.00'))
+        cap = Product.objects.create(name="Cap", sku="R2", base_price=Decimal('5.00'))
+        lines = [
+            (self.ann, self.shirt, "M", 2, Decimal('20.00'), 0),
+            (self.ann, cap, "M", 10, Decimal('50.00'), 0),
+            (bob, self.shirt, "L", 1, Decimal('10.00'), 40),
+        ]
+        for i, (contact, product, size_name, qty, line_total, days_ago) in enumerate(lines):
+            order = Order.objects.create(order_no=f"ORD-R-{i}", contact=contact)
+            Order.objects.filter(id=order.id).update(created_at=order.created_at - datetime.timedelta(days=days_ago))
+            OrderItem.objects.create(order=order, product=product, size_name=size_name, qty=qty,
+                                     unit_price=line_total / qty, line_total=line_total)
+
+    def report(self, query):
+        response = self.client.get(f'/api/reports/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['rows']
+
+    def test_group_by(self):
+        self.assertEqual([(r['key'], r['revenue']) for r in self.report('group_by=size_name')], [("L", 10.0), ("M", 70.0)])
+        by_product = self.report('group_by=product')
+        self.assertEqual([(r['label'], r['quantity'], r['orders']) for r in by_product], [("Shirt", 3, 2), ("Cap", 10, 1)])
+        self.assertEqual(len(self.report('group_by=day')), 2)
+        self.assertEqual(len(self.report('group_by=month')), len({r['key'][:7] for r in self.report('group_by=day')}))
+
+    def test_top_n_and_date_filter(self):
+        import datetime
+        top = self.report('top=products&metric=quantity&limit=1')
+        self.assertEqual([(r['label'], r['quantity']) for r in top], [("Cap", 10)])
+        recent = (datetime.date.today() - datetime.timedelta(days=7)).isoformat()
+        contacts = self.report(f'top=contacts&date_from={recent}')
+        self.assertEqual([(r['label'], r['revenue']) for r in contacts], [("Ann A", 70.0)])
+
+    def test_single_query_and_cache(self):
+        # latest order id + one aggregate, then only the latest order id
+        with self.assertNumQueries(2):
+            self.report('group_by=organization')
+        with self.assertNumQueries(1):
+            rows = self.report('group_by=organization')
+        self.assertEqual(rows[0]['revenue'], 80.0)
+        order = Order.objects.create(order_no="ORD-R-NEW", contact=self.ann)
+        OrderItem.objects.create(order=order, product=self.shirt, size_name="M", qty=1, unit_price=Decimal('10.00'), line_total=Decimal('10.00'))
+        self.assertEqual(self.report('group_by=organization')[0]['revenue'], 90.0)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/reports/?group_by=year').status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/?top=products&metric=margin').status_code, 400)
+
+class IndexUsageTest(TestCase):
+    """
+    EXPLAIN-based checks that each hot lookup is served by an index (SQLite query plans).
+    """
+    def setUp(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest("Query plan assertions are written against SQLite")
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), plan)
+
+    def test_hot_queries_use_indexes(self):
+        import datetime
+        from django.utils import timezone
+        # SQLite turns unique constraints into an inline UNIQUE with an automatic index
+        self.assertUsesIndex(SizePrice.objects.filter(product_id=1, size_name="M"), 'unique_size_per_product', 'sqlite_autoindex_crm_core_sizeprice')
+        self.assertUsesIndex(Order.objects.order_by('-created_at', '-id')[:50], 'order_created_id_idx')
+        self.assertUsesIndex(Order.objects.filter(created_at__gte=timezone.now() - datetime.timedelta(days=1)), 'order_created_id_idx')
+        self.assertUsesIndex(Contact.objects.filter(last_name="Doe"), 'contact_name_idx')
+        self.assertUsesIndex(Contact.objects.filter(organization_id=1).order_by('last_name'), 'contact_org_name_idx')
+        self.assertUsesIndex(OrderItem.objects.filter(order_id=1, product_id=1), 'orderitem_order_product_idx')
+
+    def test_duplicate_size_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="u1", password="pw"))
+        product = Product.objects.create(name="Prod", sku="IX1", base_price=Decimal('10.00'))
+        self.assertEqual(client.post(f'/api/products/{product.id}/sizes/', {"size_name": "M", "price": "12.00"}).status_code, 201)
+        self.assertEqual(client.post(f'/api/products/{product.id}/sizes/', {"size_name": "M", "price": "13.00"}).status_code, 400)
+        # A concurrent insert that slips past the check hits the unique constraint instead
+        from unittest import mock
+        with mock.patch('django.db.models.query.QuerySet.exists', return_value=False):
+            response = client.post(f'/api/products/{product.id}/sizes/', {"size_name": "M", "price": "13.00"})
+        self.assertEqual((response.status_code, list(response.data)), (400, ['size_name']))
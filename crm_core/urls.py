@@ -3,14 +3,18 @@ from .views import (
     OrganizationListCreateView, OrganizationRetrieveUpdateDestroyView,
     ContactListCreateView, ContactRetrieveUpdateDestroyView,
     ProductListCreateView, ProductRetrieveUpdateDestroyView,
-    SizePriceCreateView, OrderListCreateView, OrderDetailView,
-    LoginView, AdminStatsView, index_page
+    SizePriceCreateView, OrderListCreateView, OrderDetailView, QuoteView, BootstrapView,
+    LoginView, AdminStatsView, PerfStatsView, ReportView, SearchView, ExportView, ImportView, index_page
 )
 
 urlpatterns = [
     path('', index_page, name='index'),
     path('auth/login/', LoginView.as_view(), name='login'),
     path('admin/stats/', AdminStatsView.as_view(), name='admin-stats'),
+    path('admin/perf/', PerfStatsView.as_view(), name='admin-perf'),
+    path('reports/', ReportView.as_view(), name='reports'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     
     path('organizations/', OrganizationListCreateView.as_view(), name='org-list'),
     path('organizations/<int:pk>/', OrganizationRetrieveUpdateDestroyView.as_view(), name='org-detail'),
@@ -24,4 +28,8 @@ urlpatterns = [
     
     path('orders/', OrderListCreateView.as_view(), name='order-list'),
     path('orders/<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
+    path('pricing/quote', QuoteView.as_view(), name='pricing-quote'),
+
+    path('export/<str:resource>.<str:export_format>', ExportView.as_view(), name='export'),
+    path('import/<str:resource>/', ImportView.as_view(), name='import'),
 ]
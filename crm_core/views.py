@@ -1,15 +1,35 @@
 from rest_framework import generics, status, permissions, views
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Organization, Contact, Product, SizePrice, Order, OrderItem
+from rest_framework.exceptions import ValidationError
+from .authentication import tokens_for_user
+from .models import Organization, Contact, Product, SizePrice, Order, OrderItem, RevenueRollup
 from .serializers import (
     OrganizationSerializer, ContactSerializer, ProductSerializer, 
-    SizePriceSerializer, OrderSerializer, UserSerializer
+    SizePriceSerializer, OrderSerializer, UserSerializer,
+    OrganizationReadSerializer, ContactReadSerializer, ProductReadSerializer, OrderReadSerializer
 )
-from .logic import calculate_item_price, apply_offer, generate_order_number, get_normalized_items
-from django.db import transaction
+from .pagination import OrderKeysetPagination
+from .http_cache import ConditionalGetMixin
+from .db_routers import read_alias
+from .exports import EXPORTS, stream_export
+from .imports import IMPORTERS, import_rows, read_rows
+from .stats import dashboard_stats
+from .perf import perf_registry
+from .reports import cached_report
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_TYPES, search
+from .catalog import price_catalog
+from .bootstrap import SECTIONS, bootstrap_version, bootstrap_written_recently, build_bootstrap
+from .sync import DeltaSyncMixin
+from .logic import QUOTE_MAX_LINES, create_order, get_normalized_items, price_items, quote_items
+from .idempotency import IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, claim, complete, release, request_fingerprint
+from django.http import StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from decimal import Decimal
 
 class LoginView(views.APIView):
+    # A stale or revoked token sent along must not block logging in again
+    authentication_classes = []
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
@@ -18,7 +38,7 @@ class LoginView(views.APIView):
         password = request.data.get('password')
         user = authenticate(username=username, password=password)
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -26,42 +46,89 @@ class LoginView(views.APIView):
             })
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-class OrganizationListCreateView(generics.ListCreateAPIView):
+class ReadSerializerMixin:
+    """
+    Uses read_serializer_class for GET requests and serializer_class for writes.
+    """
+    read_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.read_serializer_class is not None:
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        # GET list/detail reads may be served by a read replica (see db_routers.py)
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = queryset.using(read_alias())
+        return queryset
+
+def order_queryset():
+    # contact for contact_name, items with their product for product_name: 2 queries for any page
+    return Order.objects.select_related('contact').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+    )
+
+class OrganizationListCreateView(ConditionalGetMixin, ReadSerializerMixin, DeltaSyncMixin, generics.ListCreateAPIView):
+    cache_resource = 'organizations'
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
+    read_serializer_class = OrganizationReadSerializer
 
-class OrganizationRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class OrganizationRetrieveUpdateDestroyView(ConditionalGetMixin, ReadSerializerMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_resource = 'organizations'
     queryset = Organization.objects.all()
     serializer_class = OrganizationSerializer
+    read_serializer_class = OrganizationReadSerializer
 
-class ContactListCreateView(generics.ListCreateAPIView):
-    queryset = Contact.objects.all()
+class ContactListCreateView(ConditionalGetMixin, ReadSerializerMixin, DeltaSyncMixin, generics.ListCreateAPIView):
+    cache_resource = 'contacts'
+    queryset = Contact.objects.select_related('organization')
     serializer_class = ContactSerializer
+    read_serializer_class = ContactReadSerializer
 
-class ContactRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Contact.objects.all()
+class ContactRetrieveUpdateDestroyView(ConditionalGetMixin, ReadSerializerMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_resource = 'contacts'
+    queryset = Contact.objects.select_related('organization')
     serializer_class = ContactSerializer
+    read_serializer_class = ContactReadSerializer
 
-class ProductListCreateView(generics.ListCreateAPIView):
-    queryset = Product.objects.all()
+class ProductListCreateView(ConditionalGetMixin, ReadSerializerMixin, DeltaSyncMixin, generics.ListCreateAPIView):
+    cache_resource = 'products'
+    queryset = Product.objects.prefetch_related('sizes')
     serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
 
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Product.objects.all()
+class ProductRetrieveUpdateDestroyView(ConditionalGetMixin, ReadSerializerMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_resource = 'products'
+    queryset = Product.objects.prefetch_related('sizes')
     serializer_class = ProductSerializer
+    read_serializer_class = ProductReadSerializer
 
 class SizePriceCreateView(generics.CreateAPIView):
     serializer_class = SizePriceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    duplicate_size_error = {'size_name': ['This size already has a price for the product.']}
 
     def perform_create(self, serializer):
         product_pk = self.kwargs.get('pk')
         product = generics.get_object_or_404(Product, pk=product_pk)
-        serializer.save(product=product)
+        if SizePrice.objects.filter(product=product, size_name=serializer.validated_data['size_name']).exists():
+            raise ValidationError(self.duplicate_size_error)
+        try:
+            with transaction.atomic():
+                serializer.save(product=product)
+        except IntegrityError:
+            # Another request added the same size between the check and the insert
+            raise ValidationError(self.duplicate_size_error)
 
-class OrderListCreateView(generics.ListCreateAPIView):
-    queryset = Order.objects.all()
+class OrderListCreateView(ConditionalGetMixin, ReadSerializerMixin, DeltaSyncMixin, generics.ListCreateAPIView):
+    cache_resource = 'orders'
+    queryset = order_queryset()
     serializer_class = OrderSerializer
+    read_serializer_class = OrderReadSerializer
+    pagination_class = OrderKeysetPagination
 
     def create(self, request, *args, **kwargs):
         data = request.data
@@ -71,72 +138,226 @@ class OrderListCreateView(generics.ListCreateAPIView):
         if not contact_id or not items_data:
             return Response({'error': 'Contact and items are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Retries carrying the same Idempotency-Key get the first response back (see idempotency.py)
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        record = None
+        if key:
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+            record, replay = claim(request.user, key, request_fingerprint(data))
+            if replay is not None:
+                return replay
+
         normalized_items = get_normalized_items(items_data)
 
         try:
-            with transaction.atomic():
-                order = Order.objects.create(
-                    order_no=generate_order_number(),
-                    contact_id=contact_id
+            # Price outside the transaction so it only covers the writes
+            priced_items = price_items(normalized_items)
+
+            order_total = sum((line[3] for line in priced_items), Decimal(0))
+
+            on_created = None
+            if record is not None:
+                on_created = lambda order: complete(
+                    record, status.HTTP_201_CREATED, created_order_body(order, priced_items, order_total)
                 )
-                
-                order_total = 0
-                created_items = []
-
-                for item in normalized_items:
-                    product = Product.objects.get(id=item['product_id'])
-                    size_name = item['size_name']
-                    qty = item.get('qty', 1)
-                    
-                    unit_price = calculate_item_price(product, size_name)
-                    unit_price_after_offer = apply_offer(unit_price, product.offer_percent)
-                    line_total = qty * unit_price_after_offer
-                    
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        size_name=size_name,
-                        qty=qty,
-                        unit_price=unit_price_after_offer,
-                        line_total=line_total,
-                        extras=item.get('extras', {}),
-                        customization=item.get('customization', '')
-                    )
-                    
-                    order_total += line_total
-                    created_items.append({
-                        'product_name': product.name,
-                        'unit_price': float(unit_price_after_offer),
-                        'qty': qty,
-                        'line_total': float(line_total)
-                    })
-
-                return Response({
-                    'id': order.id,
-                    'order_no': order.order_no,
-                    'items': created_items,
-                    'order_total': float(order_total)
-                }, status=status.HTTP_201_CREATED)
+            order = create_order(contact_id, priced_items, order_total, on_created=on_created)
+
+            return Response(created_order_body(order, priced_items, order_total), status=status.HTTP_201_CREATED)
 
         except Exception as e:
+            if record is not None:
+                release(record)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class OrderDetailView(generics.RetrieveAPIView):
-    queryset = Order.objects.all()
+def created_order_body(order, priced_items, order_total):
+    created_items = [{
+        'product_name': product.name,
+        'unit_price': float(unit_price_after_offer),
+        'qty': item.get('qty', 1),
+        'line_total': float(line_total)
+    } for item, product, unit_price_after_offer, line_total in priced_items]
+
+    return {
+        'id': order.id,
+        'order_no': order.order_no,
+        'items': created_items,
+        'order_total': float(order_total)
+    }
+
+class OrderDetailView(ConditionalGetMixin, ReadSerializerMixin, generics.RetrieveAPIView):
+    cache_resource = 'orders'
+    queryset = order_queryset()
     serializer_class = OrderSerializer
+    read_serializer_class = OrderReadSerializer
+
+class QuoteView(views.APIView):
+    """
+    Prices up to QUOTE_MAX_LINES {product_id, size_name, qty} lines with the order pricing rules,
+    without creating an order. Figures are rounded to cents and returned as strings.
+    """
+    def post(self, request):
+        lines = request.data.get('items') if isinstance(request.data, dict) else None
+        if not isinstance(lines, list) or not lines:
+            return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lines) > QUOTE_MAX_LINES:
+            return Response({'error': f'At most {QUOTE_MAX_LINES} items per quote'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Plain type checks: a serializer per line costs more than pricing it
+        is_int = lambda value: isinstance(value, int) and not isinstance(value, bool)
+        errors = {}
+        for i, line in enumerate(lines):
+            if not isinstance(line, dict):
+                errors[i] = 'Expected an object'
+            elif not is_int(line.get('product_id')):
+                errors[i] = 'product_id must be an integer'
+            elif not isinstance(line.get('size_name'), str):
+                errors[i] = 'size_name must be a string'
+            elif not is_int(line.get('qty', 1)) or line.get('qty', 1) < 1:
+                errors[i] = 'qty must be a positive integer'
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = price_catalog.snapshot()
+        unknown = sorted({line['product_id'] for line in lines} - snapshot.products.keys())
+        if unknown:
+            return Response({'error': 'Unknown products', 'product_ids': unknown}, status=status.HTTP_400_BAD_REQUEST)
+
+        quoted, total = quote_items(lines, snapshot)
+        return Response({
+            'items': [{
+                'product_id': product.id,
+                'product_name': product.name,
+                'size_name': size_name,
+                'qty': qty,
+                'unit_price': str(unit_price),
+                'line_total': str(line_total),
+            } for product, size_name, qty, unit_price, line_total in quoted],
+            'line_count': len(quoted),
+            'total': str(total),
+        })
+
+class BootstrapView(ConditionalGetMixin, views.APIView):
+    """
+    Data for a page of the app in one response: ?include=organizations,contacts,catalog,stats
+    (default: all of them). See bootstrap.py for the sections.
+    """
+    cache_resource = 'bootstrap'
+
+    def get(self, request):
+        include = request.query_params.get('include')
+        self.sections = [s for s in include.split(',') if s] if include else list(SECTIONS)
+        if not self.sections or any(s not in SECTIONS for s in self.sections):
+            return Response({'error': f"include must be a comma separated subset of {list(SECTIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return super().get(request)
+
+    def get_cache_version(self):
+        return bootstrap_version(self.sections)
+
+    def written_recently(self):
+        return bootstrap_written_recently(self.sections)
+
+    def build_response(self, request):
+        return Response(build_bootstrap(request, self.sections))
+
+class ExportView(views.APIView):
+    """
+    Streams a full resource as NDJSON or CSV without paginating or buffering it.
+    Orders accept date_from / date_to (ISO date or datetime, inclusive) on created_at.
+    """
+    content_types = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    def get(self, request, resource, export_format):
+        if resource not in EXPORTS or export_format not in self.content_types:
+            return Response({'error': 'Unknown export'}, status=status.HTTP_404_NOT_FOUND)
+        rows = stream_export(resource, export_format, request.query_params)
+        response = StreamingHttpResponse(rows, content_type=self.content_types[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{export_format}"'
+        return response
+
+class ImportView(views.APIView):
+    """
+    Bulk upsert of organizations, contacts or products (admin only).
+    Body: a JSON list of rows, or a CSV / NDJSON file (Content-Type text/csv or application/x-ndjson).
+    Invalid rows are reported by row number and skipped; the rest are imported.
+    """
+    def post(self, request, resource):
+        if request.user.role != 'admin':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        if resource not in IMPORTERS:
+            return Response({'error': 'Unknown import'}, status=status.HTTP_404_NOT_FOUND)
+
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type in ('text/csv', 'application/x-ndjson'):
+            try:
+                lines = request.body.decode('utf-8').splitlines()
+            except UnicodeDecodeError:
+                return Response({'error': 'Body must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = read_rows(lines, 'csv' if content_type == 'text/csv' else 'ndjson')
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response({'error': 'Expected a list of rows'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(import_rows(resource, rows))
+
+class ReportView(views.APIView):
+    """
+    Sales reports aggregated in the database (admin only); see reports.build_report for parameters.
+    """
+    def get(self, request):
+        if request.user.role != 'admin':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(cached_report(request.query_params))
+
+class SearchView(views.APIView):
+    """
+    Ranked prefix search for typeahead: ?q=<text>&type=contacts,organizations,products&limit=N.
+    """
+    def get(self, request):
+        types = [t for t in request.query_params.get('type', '').split(',') if t]
+        if any(t not in SEARCH_TYPES for t in types):
+            return Response({'error': f"type must be a comma separated subset of {sorted(SEARCH_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = [SEARCH_TYPES[t] for t in types]
+        return Response({'results': search(request.query_params.get('q', ''), kinds, limit)})
 
 class AdminStatsView(views.APIView):
     def get(self, request):
         if request.user.role != 'admin':
             return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
-        stats = {
-            'total_organizations': Organization.objects.count(),
-            'total_contacts': Contact.objects.count(),
-            'total_products': Product.objects.count(),
-            'total_orders': Order.objects.count(),
-        }
+        # Counters and rollups are maintained incrementally (see stats.py)
+        stats = dashboard_stats()
+        breakdown = request.query_params.get('breakdown')
+        if breakdown in dict(RevenueRollup.DIMENSION_CHOICES):
+            stats['breakdown'] = [
+                {'key': r.key, 'orders': r.orders, 'quantity': r.quantity, 'revenue': float(r.revenue)}
+                for r in RevenueRollup.objects.filter(dimension=breakdown).order_by('-revenue')[:100]
+            ]
         return Response(stats)
 
+class PerfStatsView(views.APIView):
+    """
+    Per-view request metrics of this worker process (admin only): p50/p95/p99/max/mean of wall
+    time, DB time and queries, serializer time and response bytes. DELETE resets them.
+    """
+    def get(self, request):
+        if request.user.role != 'admin':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(perf_registry.snapshot())
+
+    def delete(self, request):
+        if request.user.role != 'admin':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        perf_registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class HealthCheckView(views.APIView):
     permission_classes = [permissions.AllowAny]
     def get(self, request):
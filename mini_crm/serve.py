@@ -0,0 +1,179 @@
+"""
+Production server for mini_crm: python -m mini_crm.serve [options]
+
+Runs the WSGI application (the ASGI one with --asgi) under gunicorn's pre-fork master:
+- The application is imported and warmed up (see warmup.py) once in the master before it forks,
+  so workers share it copy-on-write instead of each paying for it on its first requests.
+- Workers are replaced after --max-requests requests (plus up to --max-requests-jitter, so they
+  do not all restart at once) to bound memory growth.
+- More than one worker needs a shared cache (CACHE_URL): with the per-process default, cache
+  invalidations would only reach the worker that made the write, so a single worker is started.
+- SIGHUP starts fresh workers and gives the old ones --graceful-timeout seconds to finish their
+  in-flight requests; SIGTERM drains the same way before exiting. A preloaded application is not
+  re-imported on SIGHUP: restart the master to deploy new code.
+- The master logs a startup report (import, setup and warm-up times) once it is ready;
+  --report prints it together with the slowest imports and exits without serving.
+
+Options default to environment variables so containers can be tuned without changing the command.
+"""
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+start = time.perf_counter()
+from gunicorn.app.base import BaseApplication  # noqa: E402
+GUNICORN_IMPORT_TIME = time.perf_counter() - start
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def load_application(asgi=False, warm=True):
+    """Imports Django and the application, warms it up, and returns (application, [(phase, seconds)])."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_crm.settings')
+    timings = [('gunicorn', GUNICORN_IMPORT_TIME)]
+
+    start = time.perf_counter()
+    import django
+    django.setup(set_prefix=False)
+    timings.append(('django.setup', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    if asgi:
+        from mini_crm.asgi import application
+    else:
+        from mini_crm.wsgi import application
+    timings.append(('application', time.perf_counter() - start))
+
+    if warm:
+        from mini_crm.warmup import warm_up
+        timings += [(f'warmup.{name}', seconds) for name, seconds in warm_up()]
+    return application, timings
+
+
+def format_report(timings):
+    total = sum(seconds for _, seconds in timings)
+    lines = [f"Startup report: ready in {total * 1000:.0f} ms"]
+    lines += [f"  {name:<20} {seconds * 1000:8.1f} ms" for name, seconds in timings]
+    return '\n'.join(lines)
+
+
+def slowest_imports(asgi=False, limit=15):
+    """Import time of the application per top-level package (summed self times), slowest first."""
+    module = 'mini_crm.asgi' if asgi else 'mini_crm.wsgi'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env={'DJANGO_SETTINGS_MODULE': 'mini_crm.settings', **os.environ},
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1e6
+    return sorted(packages.items(), key=lambda row: row[1], reverse=True)[:limit]
+
+
+def when_ready(server):
+    logger.info(format_report(server.app.timings))
+
+
+def pre_fork(server, worker):
+    # Lowest slot no live worker holds: stable small ids for the order number generator
+    used = {getattr(other, 'slot', None) for other in server.WORKERS.values()}
+    worker.slot = next(slot for slot in itertools.count() if slot not in used)
+
+
+def post_fork(server, worker):
+    from django.conf import settings
+    from crm_core.order_numbers import reset_generators
+
+    # Time-ordered order numbers need a distinct worker id per process
+    settings.ORDER_NUMBER_WORKER_ID = (settings.ORDER_NUMBER_WORKER_ID or 0) + worker.slot
+    reset_generators()
+
+
+class Server(BaseApplication):
+    def __init__(self, options, asgi=False, warm=True):
+        self.options = options
+        self.asgi = asgi
+        self.warm = warm
+        self.timings = []
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        application, self.timings = load_application(self.asgi, self.warm)
+        return application
+
+
+def has_shared_cache():
+    """Whether the default cache is shared between processes (see CACHES in settings.py)."""
+    from django.conf import settings
+
+    return settings.CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=os.environ.get('SERVE_BIND', '0.0.0.0:8000'))
+    parser.add_argument('--workers', type=int, default=env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+    parser.add_argument('--threads', type=int, default=env_int('SERVE_THREADS', 1), help="threads per WSGI worker")
+    parser.add_argument('--asgi', action='store_true', default=os.environ.get('SERVE_ASGI', '') == '1',
+                        help="serve mini_crm.asgi with uvicorn workers (pip install uvicorn)")
+    parser.add_argument('--max-requests', type=int, default=env_int('SERVE_MAX_REQUESTS', 1000), help="0 disables recycling")
+    parser.add_argument('--max-requests-jitter', type=int, default=env_int('SERVE_MAX_REQUESTS_JITTER', 100))
+    parser.add_argument('--timeout', type=int, default=env_int('SERVE_TIMEOUT', 30))
+    parser.add_argument('--graceful-timeout', type=int, default=env_int('SERVE_GRACEFUL_TIMEOUT', 30))
+    parser.add_argument('--no-warmup', action='store_true', help="skip warmup.py")
+    parser.add_argument('--report', action='store_true', help="print the startup report and slowest imports, then exit")
+    args = parser.parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mini_crm.settings')
+    if args.workers > 1 and not args.report and not has_shared_cache():
+        # Catalog versions, ETags and cached responses would only be invalidated in the writing worker
+        logger.warning("%d workers need a shared cache, starting 1: set CACHE_URL (e.g. redis://localhost:6379/0)", args.workers)
+        args.workers = 1
+
+    if args.report:
+        _, timings = load_application(args.asgi, not args.no_warmup)
+        print(format_report(timings))
+        print("Import time by package:")
+        for name, seconds in slowest_imports(args.asgi):
+            print(f"  {name:<40} {seconds * 1000:8.1f} ms")
+        return
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'preload_app': True,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'accesslog': '-',
+        'when_ready': when_ready,
+        'pre_fork': pre_fork,
+        'post_fork': post_fork,
+    }
+    if args.asgi:
+        options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+    elif args.threads > 1:
+        options.update(worker_class='gthread', threads=args.threads)
+    Server(options, asgi=args.asgi, warm=not args.no_warmup).run()
+
+
+if __name__ == '__main__':
+    main()
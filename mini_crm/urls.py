@@ -21,5 +21,6 @@ from crm_core.views import HealthCheckView
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', HealthCheckView.as_view(), name='health'),
+    path('api/async/', include('crm_core.async_urls')),
     path('api/', include('crm_core.urls')),
 ]
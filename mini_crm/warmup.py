@@ -0,0 +1,71 @@
+"""
+Boot-time warm-up for serving processes (see serve.py).
+
+Does the work the first requests of a fresh process would otherwise pay for: building the URL
+resolver, Django's model metadata and compiled queries, DRF's lazily imported settings, the index
+template and the price catalog. Run in the preloading parent, it is shared with every forked worker.
+"""
+import time
+
+from django.apps import apps
+from django.db import connections
+
+
+def warm_urls():
+    from django.urls import get_resolver, reverse
+
+    get_resolver().url_patterns
+    reverse('order-list')
+
+
+def warm_orm():
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.related_objects
+        # Compiles the default SELECT without running it
+        str(model._default_manager.all().query)
+
+
+def warm_drf():
+    from rest_framework.settings import api_settings
+
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, name)
+
+
+def warm_templates():
+    from django.template.loader import get_template
+
+    get_template('index.html')
+
+
+def warm_catalog():
+    from crm_core.catalog import price_catalog
+
+    price_catalog.snapshot()
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('orm', warm_orm),
+    ('drf', warm_drf),
+    ('templates', warm_templates),
+    ('catalog', warm_catalog),
+)
+
+
+def warm_up():
+    """
+    Runs every step and returns [(step, seconds)]. Database connections opened on the way are
+    closed, so forked workers never share a socket with the parent.
+    """
+    timings = []
+    try:
+        for name, step in STEPS:
+            start = time.perf_counter()
+            step()
+            timings.append((name, time.perf_counter() - start))
+    finally:
+        connections.close_all()
+    return timings
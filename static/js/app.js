@@ -4,9 +4,14 @@ const app = {
         user: JSON.parse(localStorage.getItem('user')),
         currentPage: 'dashboard',
         organizations: [],
+        organizationNames: {},
         contacts: [],
         products: [],
         orders: [],
+        catalog: [],
+        stats: null,
+        contactsNext: null,
+        cursors: {},
     },
 
     init() {
@@ -22,14 +27,10 @@ const app = {
     navigate(page) {
         this.state.currentPage = page;
         if (page === 'organizations') this.loadOrganizations();
-        else if (page === 'contacts') {
-            this.api('/api/organizations/').then(res => res.json()).then(data => {
-                this.state.organizations = data;
-                this.loadContacts();
-            });
-        }
+        else if (page === 'contacts') this.loadContacts();
         else if (page === 'products') this.loadProducts();
         else if (page === 'orders') this.loadOrders();
+        else if (page === 'dashboard') this.loadDashboard();
         else this.render();
     },
 
@@ -103,20 +104,97 @@ const app = {
         return response;
     },
 
-    async loadOrganizations() {
-        const res = await this.api('/api/organizations/');
-        if (res && res.ok) {
-            this.state.organizations = await res.json();
-            this.render();
+    async apiList(url) {
+        // List endpoints are cursor paginated: follow `next` links and collect every row
+        const rows = [];
+        while (url) {
+            const res = await this.api(url);
+            if (!res || !res.ok) break;
+            const page = await res.json();
+            rows.push(...page.results);
+            url = page.next;
         }
+        return rows;
     },
 
-    async loadContacts() {
-        const res = await this.api('/api/contacts/');
-        if (res && res.ok) {
-            this.state.contacts = await res.json();
-            this.render();
+    async bootstrap(sections) {
+        // Everything a page needs in one request; the browser revalidates it with its ETag
+        const res = await this.api(`/api/bootstrap/?include=${sections.join(',')}`);
+        if (!res || !res.ok) return {};
+        const data = await res.json();
+        if (data.organizations) this.state.organizationNames = data.organizations;
+        if (data.contacts) {
+            this.state.contacts = data.contacts.results;
+            this.state.contactsNext = data.contacts.next;
         }
+        if (data.catalog) this.state.catalog = data.catalog;
+        if (data.stats) this.state.stats = data.stats;
+        return data;
+    },
+
+    async loadDashboard() {
+        await this.bootstrap(['stats']);
+        this.render();
+    },
+
+    async syncList(resource, compare = (a, b) => a.id - b.id) {
+        // Delta sync: after the first load only the rows changed since the last cursor are fetched
+        const since = this.state.cursors[resource];
+        const rows = new Map(since ? this.state[resource].map(r => [r.id, r]) : []);
+        let url = `/api/${resource}/?since=${since || 0}`;
+        let cursor = null;
+        while (url) {
+            const res = await this.api(url);
+            if (res && res.status === 410) {
+                // Cursor too old to know every delete: reload the collection
+                delete this.state.cursors[resource];
+                return this.syncList(resource, compare);
+            }
+            if (!res || !res.ok) return;
+            const page = await res.json();
+            page.results.forEach(r => rows.set(r.id, r));
+            page.deleted.forEach(id => rows.delete(id));
+            cursor = page.cursor;
+            url = page.next;
+        }
+        this.state.cursors[resource] = cursor;
+        this.state[resource] = [...rows.values()].sort(compare);
+    },
+
+    async loadOrganizations() {
+        await this.syncList('organizations');
+        this.render();
+    },
+
+    async loadContacts() {
+        await this.bootstrap(['organizations', 'contacts']);
+        this.render();
+    },
+
+    async loadMoreContacts() {
+        const res = await this.api(this.state.contactsNext);
+        if (!res || !res.ok) return;
+        const page = await res.json();
+        this.state.contacts.push(...page.results);
+        this.state.contactsNext = page.next;
+        this.render();
+    },
+
+    searchContacts(query) {
+        // Typeahead against the server-side index, debounced; an empty box shows the full list again
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(async () => {
+            const tbody = document.querySelector('#contact-list tbody');
+            if (!tbody) return;
+            if (!query.trim()) {
+                tbody.innerHTML = this.state.contacts.map(c => `<tr><td>${c.first_name} ${c.last_name}</td><td>${c.email}</td><td>${c.phone}</td><td>${c.organization_name}</td></tr>`).join('');
+                return;
+            }
+            const res = await this.api(`/api/search/?type=contacts&q=${encodeURIComponent(query)}`);
+            if (!res || !res.ok) return;
+            const { results } = await res.json();
+            tbody.innerHTML = results.map(r => `<tr><td>${r.title}</td><td colspan="3">${r.subtitle}</td></tr>`).join('');
+        }, 150);
     },
 
     async createOrganization(data) {
@@ -134,11 +212,8 @@ const app = {
     },
 
     async loadProducts() {
-        const res = await this.api('/api/products/');
-        if (res && res.ok) {
-            this.state.products = await res.json();
-            this.render();
-        }
+        await this.syncList('products');
+        this.render();
     },
 
     async createProduct(data, sizes) {
@@ -153,11 +228,9 @@ const app = {
     },
 
     async loadOrders() {
-        const res = await this.api('/api/orders/');
-        if (res && res.ok) {
-            this.state.orders = await res.json();
-            this.render();
-        }
+        // Newest first, like /api/orders/
+        await this.syncList('orders', (a, b) => new Date(b.created_at) - new Date(a.created_at) || b.id - a.id);
+        this.render();
     },
 
     async createOrder(data) {
@@ -217,7 +290,17 @@ const app = {
                 }
                 break;
             case 'dashboard':
-                main.innerHTML = `<h1>Dashboard</h1><p>Welcome back, ${this.state.user?.username}!</p>`;
+                const stats = this.state.stats;
+                main.innerHTML = `<h1>Dashboard</h1><p>Welcome back, ${this.state.user?.username}!</p>` + (stats ? `
+                    <table class="table">
+                        <tbody>
+                            <tr><td>Organizations</td><td>${stats.total_organizations}</td></tr>
+                            <tr><td>Contacts</td><td>${stats.total_contacts}</td></tr>
+                            <tr><td>Products</td><td>${stats.total_products}</td></tr>
+                            <tr><td>Orders</td><td>${stats.total_orders}</td></tr>
+                        </tbody>
+                    </table>
+                ` : '');
                 break;
             case 'organizations':
                 main.innerHTML = `
@@ -239,11 +322,13 @@ const app = {
                         <h1>Contacts</h1>
                         <button class="btn btn-primary" style="width: auto;" onclick="app.showContactForm()">Add Contact</button>
                     </div>
+                    <input type="search" id="contact-search" placeholder="Search name, email, phone or organization" oninput="app.searchContacts(this.value)">
                     <div id="contact-list">
                         <table class="table">
                             <thead><tr><th>Name</th><th>Email</th><th>Phone</th><th>Organization</th></tr></thead>
                             <tbody>${this.state.contacts.map(c => `<tr><td>${c.first_name} ${c.last_name}</td><td>${c.email}</td><td>${c.phone}</td><td>${c.organization_name}</td></tr>`).join('')}</tbody>
                         </table>
+                        ${this.state.contactsNext ? `<button class="btn" style="width:auto" onclick="app.loadMoreContacts()">Load more</button>` : ''}
                     </div>
                 `;
                 break;
@@ -317,11 +402,8 @@ const app = {
 
     async showOrderForm() {
         const main = document.getElementById('main-content');
-        // Load dependencies
-        const [orgsRes, prodRes] = await Promise.all([this.api('/api/organizations/'), this.api('/api/products/')]);
-        const organizations = await orgsRes.json();
-        const products = await prodRes.json();
-        this.state.products = products;
+        // Catalog and the first page of contacts in one request
+        const data = await this.bootstrap(['catalog', 'contacts']);
 
         main.innerHTML = `
             <div class="card">
@@ -352,8 +434,8 @@ const app = {
             </div>
         `;
 
-        // Populate contacts
-        this.api('/api/contacts/').then(res => res.json()).then(contacts => {
+        // Populate contacts, following the pages after the first one in the background
+        const addContacts = contacts => {
             const select = document.getElementById('o-contact');
             contacts.forEach(c => {
                 const opt = document.createElement('option');
@@ -361,7 +443,9 @@ const app = {
                 opt.textContent = `${c.first_name} ${c.last_name}`;
                 select.appendChild(opt);
             });
-        });
+        };
+        addContacts(this.state.contacts);
+        if (data.contacts && data.contacts.next) this.apiList(data.contacts.next).then(addContacts);
 
         this.addItemRow();
         document.getElementById('order-form').onsubmit = (e) => {
@@ -393,7 +477,7 @@ const app = {
                     <label>Product</label>
                     <select class="form-control i-prod" required onchange="app.onOrderProductChange(this)">
                         <option value="">Select Product</option>
-                        ${this.state.products.map(p => `<option value="${p.id}">${p.name}</option>`).join('')}
+                        ${this.state.catalog.map(p => `<option value="${p.id}">${p.name}</option>`).join('')}
                     </select>
                 </div>
                 <div class="form-group">
@@ -428,7 +512,7 @@ const app = {
         sizeSelect.innerHTML = '<option value="">Select Size</option>';
 
         if (productId) {
-            const product = this.state.products.find(p => p.id == productId);
+            const product = this.state.catalog.find(p => p.id == productId);
             if (product) {
                 // Add sizes
                 product.sizes.forEach(s => {
@@ -459,7 +543,7 @@ const app = {
             const priceInfo = row.querySelector('.item-price-info');
 
             if (prodId && sizeSelect.value) {
-                const product = this.state.products.find(p => p.id == prodId);
+                const product = this.state.catalog.find(p => p.id == prodId);
                 const sizeOpt = sizeSelect.options[sizeSelect.selectedIndex];
                 let price = parseFloat(sizeOpt.dataset.price);
 
@@ -519,7 +603,7 @@ const app = {
                         <label>Organization</label>
                         <select id="c-org" class="form-control" required>
                             <option value="">Select Organization</option>
-                            ${this.state.organizations.map(o => `<option value="${o.id}">${o.name}</option>`).join('')}
+                            ${Object.entries(this.state.organizationNames).map(([id, name]) => `<option value="${id}">${name}</option>`).join('')}
                         </select>
                     </div>
                     <div class="flex-end">